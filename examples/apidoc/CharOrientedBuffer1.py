@@ -1,7 +1,7 @@
 """`CharOrientedBuffer1.py`
 
-Example usage of `ezmlex.buffers.CharOrientedBuffer` class. Read chunks of 
-32 characters and output chunks of 8 characters.
+Example usage of `ezmlex.buffers.CharOrientedBuffer` class. Read input in
+chunks of 4096 characters and output chunks of 8 characters.
 """
 
 #
@@ -28,22 +28,24 @@ Example usage of `ezmlex.buffers.CharOrientedBuffer` class. Read chunks of
 __docformat__ = "restructuredText"
 
 
+import sys
 from ezmlex.buffers import CharOrientedBuffer
 class Buffer(CharOrientedBuffer):
-    @classmethod
-    def _make_fsm_str(cls,items):
-        return items
+    _fsm_identity = True
 txt = """Lorem ipsum dolor sit amet, consectetur adipiscing
 elit. Sed aliquet odio quis elit aliquet eu interdum justo
 adipiscing. Vestibulum sodales ornare adipiscing."""
 buf = Buffer(txt)
-while buf.extend(32):
-    while 8 <= len(buf):
-        s = buf.shift(8)
-        print "%d:%d:%r" % (s.line_no(), s.col_no(), s.__str__())
+chunk_size = 4096
+write = sys.stdout.write
+while buf.extend(chunk_size):
+    # Output chunks shifted out from the buffer with a single write
+    lines = ["%d:%d:%r\n" % (line_no, col_no, string)
+             for line_no, col_no, char_no, string in buf.shift_chunks(8)]
+    write(''.join(lines))
 if len(buf):
     # Print out remaining part of text (a tail shorter than 8 chars)
-    print "%d:%d:%r" % (buf.line_no(), buf.col_no(), buf.__str__())
+    write("%d:%d:%r\n" % (buf.line_no(), buf.col_no(), buf.__str__()))
 
 # Local Variables:
 # # tab-width:4
@@ -28,38 +28,40 @@ input, treat all other tokens as errors.
 __docformat__ = "restructuredText"
 
 import re
+import sys
 from ezmlex.buffers import CharOrientedBuffer
 class Buffer(CharOrientedBuffer):
-    @classmethod
-    def _make_fsm_str(cls,items):
-        return items
+    _fsm_identity = True
 txt = """Lorem ipsum dolor sit amet, consectetur adipiscing
 elit. Sed aliquet odio quis elit aliquet eu interdum justo
 adipiscing. Vestibulum sodales ornare adipiscing."""
 buf = Buffer(txt)
-word = re.compile(r'[a-zA-Z]+')
-sep = re.compile(r'[ \t\n]+')
-eoi = (buf.extend(32) < 32)
+chunk_size = 4096
+scan = re.compile(r'(?P<word>[a-zA-Z]+)|(?P<sep>[ \t\n]+)|(?P<error>.)',
+                  re.DOTALL).finditer
+write = sys.stdout.write
+eoi = (buf.extend(chunk_size) < chunk_size)
 while len(buf):
-    wm = word.match(buf.fsm_str())
-    sm = sep.match(buf.fsm_str())
-    if wm:
-        if len(wm.group(0)) < len(buf) or eoi:
-            # entire word recognized, shift it out from the buffer and
-            # print it out
-            s = buf.shift(len(wm.group(0)))
-            print "%d:%d:word:%r" % (s.line_no(), s.col_no(), s.__str__())
-        else:
-            # read more characters to recover entire word
-            eoi = (buf.extend(32) < 32)
-    elif sm:
-        # just shift out whitespaces
-        buf.shift(len(sm.group(0)))
-    else:
-        print "%d:%d:error:%r" % (buf.line_no(), buf.col_no(), buf[0])
-        buf.shift(1)
-    if not eoi and len(buf) == 0:
-        buf.extend(32)
+    fsm_str = buf.fsm_str()
+    fsm_len = len(fsm_str)
+    lines = []
+    for m in scan(fsm_str):
+        start, end = m.span()
+        if end == fsm_len and not eoi:
+            # the token may continue in unread input, read more characters
+            # to recover it entirely
+            break
+        # shift the recognized token out from the buffer and print it out
+        # (whitespaces are just shifted out)
+        s = buf.shift(end - start)
+        if m.lastgroup == 'word':
+            lines.append("%d:%d:word:%r\n" % (s.line_no(), s.col_no(), s.__str__()))
+        elif m.lastgroup == 'error':
+            lines.append("%d:%d:error:%r\n" % (s.line_no(), s.col_no(), s.__str__()))
+    # Output tokens recognized in current chunk with a single write
+    write(''.join(lines))
+    if not eoi:
+        eoi = (buf.extend(chunk_size) < chunk_size)
 
 # Local Variables:
 # # tab-width:4
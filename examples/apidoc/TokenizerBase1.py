@@ -28,13 +28,12 @@ words, punctuators and whitespaces. Report errors in input stream.
 __docformat__ = "restructuredText"
 
 
+import sys
 from ezmlex.tokenizers import TokenizerBase
 from ezmlex.buffers import CharOrientedBuffer
 
 class Buffer(CharOrientedBuffer):
-    @classmethod
-    def _make_fsm_str(cls,items):
-        return items
+    _fsm_identity = True
 
 class Tokenizer(TokenizerBase):
     def _init_buffer(self, *args, **kw):
@@ -55,13 +54,14 @@ adipiscing. #% Vestibulum sodales ornare adipiscing."""
 tokenizer = Tokenizer(_input)
 
 # Recognize tokens
+write = sys.stdout.write
 for token in iter(tokenizer):
     if token.is_error():
-        print "%d:%d:Error:%s:%r" \
-          % (token.line_no(), token.col_no(), token.message(), token.value())
+        write("%d:%d:Error:%s:%r\n" \
+          % (token.line_no(), token.col_no(), token.message(), token.value()))
     else:
-        print "%d:%d:%s:%r" \
-          % (token.line_no(), token.col_no(), token.id(), token.value())
+        write("%d:%d:%s:%r\n" \
+          % (token.line_no(), token.col_no(), token.id(), token.value()))
 
 # Local Variables:
 # # tab-width:4
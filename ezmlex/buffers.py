@@ -30,6 +30,19 @@ tokenizers read the documentation of `TokenizerBufferBase`.
 
 __docformat__ = "restructuredText"
 
+from ezmlex.util import is_string, is_list
+
+def _advance_marker(line_no, col_no, char_no, string):
+    # Return the (line_no, col_no, char_no) marker of a position located just
+    # after the string which starts at (line_no, col_no, char_no) marker.
+    nchars = len(string)
+    nlines = string.count('\n')
+    if nlines == 0:
+        return (line_no, col_no + nchars, char_no + nchars)
+    else:
+        return (line_no + nlines, nchars - (string.rfind('\n') + 1),
+                char_no + nchars)
+
 
 class TokenizerBufferBase(object):
     """Base class for tokenizers' buffers.
@@ -115,7 +128,7 @@ class TokenizerBufferBase(object):
     the subclass must provide implementation of the following methods:
 
         - `fsm_str()`,
-        - `__str__()`, `__unicode__()`,
+        - `__str__()`,
         - `__len__()`, `__getitem__()`,
         - `__iter__()`,
         - `_do_assign()`, `_do_extend()`,
@@ -246,8 +259,14 @@ class TokenizerBufferBase(object):
                 keywords may be passed by other methods of
                 `TokenizerBufferBase`:
                 
-                - ``fsm_str``: supplies initial *FSM string*; this is passed
-                  by `shift()` method
+                - ``fsm_str``: supplies initial *FSM string*; `shift()`
+                  passes it directly to `_do_assign()`, which in
+                  `CharOrientedBuffer` and `LineOrientedBuffer` takes it as
+                  an explicit keyword parameter
+                - ``nlines``: number of newlines in ``content`` or ``None``;
+                  `shift()` passes it to `_do_assign()`, which in
+                  `CharOrientedBuffer` takes it as an explicit keyword
+                  parameter
         """
         self._do_assign(content,**kw)
         self.set_start_marker(line_no, col_no, char_no)
@@ -298,17 +317,30 @@ class TokenizerBufferBase(object):
 
         :Return:
             new buffer of same type containing shifted out *items*.
+
+        :Note:
+
+            The returned buffer is created with `_new_shifted()`, which
+            bypasses ``__init__()``, so any state that a subclass sets up in
+            its ``__init__()`` is not present in the returned buffer, unless
+            the subclass re-implements `_new_shifted()`.
         """
         if count is None:
             count = len(self)
+        head, tail, head_fsm_str, tail_fsm_str, head_nlines, tail_nlines = \
+            self._split(count)
         # Return shifted-out items encapsulated within a new instance of
-        # buffer.
-        s = self.__class__( None, self.line_no(), self.col_no(),
-                                     self.char_no(), self[:count],
-                                     fsm_str = self.fsm_str()[:count] )
-        # Modify starting position and assign new content
-        self.assign(s.end_line_no(), s.end_col_no(), s.end_char_no(),
-                    self[count:], fsm_str = self.fsm_str()[count:])
+        # buffer. The instance is not bound to any input, so we bypass
+        # __init__() and set up its content and start marker directly.
+        s = self._new_shifted()
+        s._do_assign(head, fsm_str = head_fsm_str, nlines = head_nlines)
+        s._line_no = self._line_no
+        s._col_no = self._col_no
+        s._char_no = self._char_no
+        s._update_end_marker()
+        # Assign new content and modify starting position (same as assign())
+        self._do_assign(tail, fsm_str = tail_fsm_str, nlines = tail_nlines)
+        self.set_start_marker(s._end_line_no, s._end_col_no, s._end_char_no)
         return s
 
     #
@@ -405,11 +437,11 @@ class TokenizerBufferBase(object):
     def __unicode__(self):
         """Return the string representation of buffer's content.
 
-        This is unicode version of `__str__()`.
-
-        The method is abstract and must be implemented in a subclass.
+        This is unicode version of `__str__()`. The default implementation
+        just returns ``self.__str__()``, so subclasses usually need not to
+        re-implement it.
         """
-        raise NotImplementedError("this method is abstract")
+        return self.__str__()
 
     def __len__(self):
         """Return length of the buffer measured in number of items held.
@@ -471,6 +503,46 @@ class TokenizerBufferBase(object):
         """
         return _input
 
+    @classmethod
+    def _new_shifted(cls):
+        """Create new buffer for items shifted out by `shift()`.
+
+        The default implementation creates the buffer with ``cls.__new__()``
+        (bypassing ``__init__()``) and sets its ``_input`` to ``None``.
+        `shift()` sets up its content and start marker. Subclasses, which
+        set up additional state in their ``__init__()``, may re-implement
+        this method to set it up in the shifted out buffers too.
+
+        :Return:
+            new buffer of type `cls`, not bound to any input.
+        """
+        s = cls.__new__(cls)
+        s._input = None
+        return s
+
+    def _split(self, count):
+        """Split buffer's content and *FSM string* at the `count`-th item.
+
+        This method is used by `shift()`. The default implementation returns
+        ``(self[:count], self[count:], fsm[:count], fsm[count:], None,
+        None)``, where ``fsm = self.fsm_str()``. Subclasses may re-implement
+        it to slice their internal objects directly, and to precompute the
+        number of lines in head and tail.
+
+        :Parameters:
+            count
+                number of items in head.
+        :Return:
+            tuple ``(head, tail, head_fsm_str, tail_fsm_str, head_nlines,
+            tail_nlines)``; `shift()` calls ``_do_assign(head, fsm_str =
+            head_fsm_str, nlines = head_nlines)`` and ``_do_assign(tail,
+            fsm_str = tail_fsm_str, nlines = tail_nlines)``. Line counts may
+            be ``None`` if unknown.
+        """
+        fsm_str = self.fsm_str()
+        return self[:count], self[count:], fsm_str[:count], fsm_str[count:], \
+               None, None
+
     def _do_assign(self, content, **kw):
         """Method called by `assign()` to setup buffer's content.
 
@@ -502,7 +574,9 @@ class TokenizerBufferBase(object):
                 new content to assign, or ``None``.
         :Keywords:
             kw
-                additional keyword parameters provided by user to `assign()`.
+                additional keyword parameters provided by user to `assign()`;
+                `shift()` always passes ``fsm_str`` and ``nlines`` (see
+                `_split()`).
         :Return:
             nothing
         """
@@ -579,9 +653,7 @@ class CharOrientedBuffer(TokenizerBufferBase):
 
         from ezmlex.buffers import CharOrientedBuffer
         class Buffer(CharOrientedBuffer):
-            @classmethod
-            def _make_fsm_str(cls, items):
-                return items
+            _fsm_identity = True
         buf = Buffer(open('file.txt','rU'))
         ...
 
@@ -592,9 +664,7 @@ class CharOrientedBuffer(TokenizerBufferBase):
         from ezmlex.buffers import CharOrientedBuffer
         import codecs
         class Buffer(CharOrientedBuffer):
-            @classmethod
-            def _make_fsm_str(cls, items):
-                return items
+            _fsm_identity = True
         buf = Buffer(codecs.open('file.txt','rU','utf-8'))
         ...
 
@@ -604,9 +674,7 @@ class CharOrientedBuffer(TokenizerBufferBase):
 
         from ezmlex.buffers import CharOrientedBuffer
         class Buffer(CharOrientedBuffer):
-            @classmethod
-            def _make_fsm_str(cls, items):
-                return items
+            _fsm_identity = True
         input = [ u'first line\\n', u'second line\\n' ]
         buf = Buffer(input)
         ...
@@ -614,30 +682,34 @@ class CharOrientedBuffer(TokenizerBufferBase):
     **Making use of CharOrientedBuffer**
     
     To make use of the `CharOrientedBuffer` one has do derive its own buffer
-    subclass which implements the `_make_fsm_str()` class method. The following
-    examples show simple usage cases to get an idea how the buffer works.
+    subclass which implements the `_make_fsm_str()` class method. If the *FSM
+    string* is just the buffer content, the subclass should rather set the
+    `_fsm_identity` class attribute to ``True``. The following examples show
+    simple usage cases to get an idea how the buffer works.
 
-    **Example**: read chunks of 32 characters and output chunks of 
-    8 characters
+    **Example**: read input in chunks of 4096 characters and output
+    chunks of 8 characters
 
     .. python::
 
+        import sys
         from ezmlex.buffers import CharOrientedBuffer
         class Buffer(CharOrientedBuffer):
-            @classmethod
-            def _make_fsm_str(cls,items):
-                return items
+            _fsm_identity = True
         txt = \"\"\"Lorem ipsum dolor sit amet, consectetur adipiscing
         elit. Sed aliquet odio quis elit aliquet eu interdum justo
         adipiscing. Vestibulum sodales ornare adipiscing.\"\"\"
         buf = Buffer(txt)
-        while buf.extend(32):
-            while 8 <= len(buf):
-                s = buf.shift(8)
-                print "%d:%d:%r" % (s.line_no(), s.col_no(), s.__str__())
+        chunk_size = 4096
+        write = sys.stdout.write
+        while buf.extend(chunk_size):
+            # Output chunks shifted out from the buffer with a single write
+            lines = ["%d:%d:%r\\n" % (line_no, col_no, string)
+                     for line_no, col_no, char_no, string in buf.shift_chunks(8)]
+            write(''.join(lines))
         if len(buf):
             # Print out remaining part of text (a tail shorter than 8 chars)
-            print "%d:%d:%r" % (buf.line_no(), buf.col_no(), buf.__str__())
+            write("%d:%d:%r\\n" % (buf.line_no(), buf.col_no(), buf.__str__()))
 
     The output generated by above script shall be::
 
@@ -670,38 +742,40 @@ class CharOrientedBuffer(TokenizerBufferBase):
     .. python::
 
         import re
+        import sys
         from ezmlex.buffers import CharOrientedBuffer
         class Buffer(CharOrientedBuffer):
-            @classmethod
-            def _make_fsm_str(cls,items):
-                return items
+            _fsm_identity = True
         txt = \"\"\"Lorem ipsum dolor sit amet, consectetur adipiscing
         elit. Sed aliquet odio quis elit aliquet eu interdum justo
         adipiscing. Vestibulum sodales ornare adipiscing.\"\"\"
         buf = Buffer(txt)
-        word = re.compile(r'[a-zA-Z]+')
-        sep = re.compile(r'[ \\t\\n]+')
-        eoi = (buf.extend(32) < 32)
+        chunk_size = 4096
+        scan = re.compile(r'(?P<word>[a-zA-Z]+)|(?P<sep>[ \\t\\n]+)|(?P<error>.)',
+                          re.DOTALL).finditer
+        write = sys.stdout.write
+        eoi = (buf.extend(chunk_size) < chunk_size)
         while len(buf):
-            wm = word.match(buf.fsm_str())
-            sm = sep.match(buf.fsm_str())
-            if wm:
-                if len(wm.group(0)) < len(buf) or eoi:
-                    # entire word recognized, shift it out from the buffer and
-                    # print it out
-                    s = buf.shift(len(wm.group(0)))
-                    print "%d:%d:word:%r" % (s.line_no(), s.col_no(), s.__str__())
-                else:
-                    # read more characters to recover entire word
-                    eoi = (buf.extend(32) < 32)
-            elif sm:
-                # just shift out whitespaces
-                buf.shift(len(sm.group(0)))
-            else:
-                print "%d:%d:error:%r" % (buf.line_no(), buf.col_no(), buf[0])
-                buf.shift(1)
-            if not eoi and len(buf) == 0:
-                buf.extend(32)
+            fsm_str = buf.fsm_str()
+            fsm_len = len(fsm_str)
+            lines = []
+            for m in scan(fsm_str):
+                start, end = m.span()
+                if end == fsm_len and not eoi:
+                    # the token may continue in unread input, read more characters
+                    # to recover it entirely
+                    break
+                # shift the recognized token out from the buffer and print it out
+                # (whitespaces are just shifted out)
+                s = buf.shift(end - start)
+                if m.lastgroup == 'word':
+                    lines.append("%d:%d:word:%r\\n" % (s.line_no(), s.col_no(), s.__str__()))
+                elif m.lastgroup == 'error':
+                    lines.append("%d:%d:error:%r\\n" % (s.line_no(), s.col_no(), s.__str__()))
+            # Output tokens recognized in current chunk with a single write
+            write(''.join(lines))
+            if not eoi:
+                eoi = (buf.extend(chunk_size) < chunk_size)
 
     The output from above script shall be::
 
@@ -741,6 +815,15 @@ class CharOrientedBuffer(TokenizerBufferBase):
     _default_chunk = 32
     """Default chunk size for `extend()` measured in characters."""
 
+    _fsm_identity = False
+    """Whether the *FSM string* is identical to the buffer content.
+
+    A subclass, for which `_make_fsm_str()` would just return its argument,
+    may set this attribute to ``True`` instead of implementing
+    `_make_fsm_str()`. The buffer content is then used as *FSM string*
+    directly, and `_make_fsm_str()` is never called.
+    """
+
     def __init__(self, *args, **kw): 
         TokenizerBufferBase.__init__(self, *args, **kw)
 
@@ -750,8 +833,48 @@ class CharOrientedBuffer(TokenizerBufferBase):
         For definition of *FSM string* see docs for `TokenizerBufferBase`."""
         return self._fsm_str
 
+    def shift_chunks(self, size):
+        """Shift out consecutive chunks of `size` characters from the buffer.
+
+        This is equivalent to calling ``self.shift(size)`` as long as
+        ``size <= len(self)``, but instead of creating new buffer object for
+        each chunk, the chunks are returned as plain tuples. The remaining
+        characters (less than `size`) are left in the buffer.
+
+        :Parameters:
+            size
+                number of characters in a single chunk, must be positive.
+
+        :Return:
+            list of ``(line_no, col_no, char_no, string)`` tuples, where
+            ``line_no``, ``col_no`` and ``char_no`` define the start marker
+            of a ``string`` chunk.
+
+        :Exceptions:
+            ValueError
+                if `size` is not positive.
+        """
+        if size <= 0:
+            raise ValueError('chunk size must be positive, not %r' % size)
+        content = self._content
+        count = len(content) - len(content) % size
+        line_no, col_no, char_no = self._line_no, self._col_no, self._char_no
+        chunks = []
+        for beg in xrange(0, count, size):
+            chunk = content[beg:beg+size]
+            chunks.append((line_no, col_no, char_no, chunk))
+            line_no, col_no, char_no = _advance_marker(line_no, col_no,
+                                                       char_no, chunk)
+        if count:
+            tail = content[count:]
+            if self._fsm_identity:
+                tail_fsm_str = tail
+            else:
+                tail_fsm_str = self._fsm_str[count:]
+            self.assign(line_no, col_no, char_no, tail, fsm_str = tail_fsm_str)
+        return chunks
+
     def _on_bind(self, _input):
-        from ezmlex.util import is_string
         if _input is None:
             self._do_extend = self._do_extend_default
             return _input
@@ -762,13 +885,12 @@ class CharOrientedBuffer(TokenizerBufferBase):
             self._do_extend = self._do_extend_by_string
             return _input
         # If it's something that have 'read()' method, we'll read characters in
-        # chunks.
-        try:
-            read = _input.read
-            if callable(read):
-                self._do_extend = self._do_extend_by_read
-                return _input
-        except AttributeError: pass
+        # chunks (the bound read method is cached for _do_extend_by_read()).
+        read = getattr(_input, 'read', None)
+        if callable(read):
+            self._input_read = read
+            self._do_extend = self._do_extend_by_read
+            return _input
         # Otherwise we'll try to read input's native portions using iterator
         # interface
         _input = iter(_input)
@@ -776,20 +898,22 @@ class CharOrientedBuffer(TokenizerBufferBase):
         return _input
         
     def _update_end_marker(self):
-        nchars = len(self._content)
-        nlines = self._content.count('\n')
-        self._end_char_no = self.char_no() + nchars
-        self._end_line_no = self.line_no() + nlines
+        # The number of newlines in content is maintained incrementally by
+        # _do_assign() and _do_append(), so we don't rescan the whole content.
+        content = self._content
+        nchars = len(content)
+        nlines = self._nlines
+        self._end_line_no = self._line_no + nlines
+        self._end_char_no = self._char_no + nchars
         if nlines == 0:
-            self._end_col_no = self.col_no() + nchars
+            self._end_col_no = self._col_no + nchars
         else:
-            self._end_col_no = nchars - (self._content.rfind('\n') + 1)
+            self._end_col_no = nchars - (content.rfind('\n') + 1)
         
     def __str__(self):
         return self._content
 
-    def __unicode__(self):
-        return self._content
+    __unicode__ = __str__
 
     def __len__(self):
         return len(self._content)
@@ -797,42 +921,76 @@ class CharOrientedBuffer(TokenizerBufferBase):
     def __getitem__(self, index):
         return self._content[index]
 
+    def _split(self, count):
+        content = self._content
+        head, tail = content[:count], content[count:]
+        # Count newlines in head only, the tail gets the rest
+        head_nlines = head.count('\n')
+        tail_nlines = self._nlines - head_nlines
+        if self._fsm_identity:
+            # Don't slice the (same) FSM string twice
+            head_fsm_str, tail_fsm_str = head, tail
+        else:
+            fsm_str = self._fsm_str
+            head_fsm_str, tail_fsm_str = fsm_str[:count], fsm_str[count:]
+        return head, tail, head_fsm_str, tail_fsm_str, head_nlines, tail_nlines
+
     def __iter__(self):
         return iter(self._content)
 
-    def _do_assign(self, content, **kw):
+    def _do_assign(self, content, fsm_str = None, nlines = None, **kw):
         if content is None:
             self._content = ''
             self._fsm_str = ''
+            self._nlines = 0
         else:
             self._content = content
-            self._fsm_str = self._make_fsm_str(content)
+            if nlines is None:
+                nlines = content.count('\n')
+            self._nlines = nlines
+            if self._fsm_identity:
+                self._fsm_str = content
+            elif fsm_str is not None:
+                # FSM string supplied by caller (e.g. shift()), no need to
+                # compute it again.
+                self._fsm_str = fsm_str
+            else:
+                self._fsm_str = self._make_fsm_str(content)
+
+    def _do_append(self, string):
+        self._content += string
+        self._nlines += string.count('\n')
+        if self._fsm_identity:
+            self._fsm_str = self._content
+        else:
+            self._fsm_str += self._make_fsm_str(string)
 
     def _do_extend_by_string(self, chunk_size):
         beg = self._tell
         end = min(self._tell + chunk_size, len(self._input))
         if end > self._tell:
-            self._content += self._input[beg:end]
-            self._fsm_str += self._make_fsm_str(self._input[beg:end])
+            self._do_append(self._input[beg:end])
             self._tell = end
         return (end - beg)
 
     def _do_extend_by_read(self, chunk_size):
-        string = self._input.read(chunk_size)
-        self._content += string
-        self._fsm_str += self._make_fsm_str(string)
+        string = self._input_read(chunk_size)
+        self._do_append(string)
         return len(string)
 
     def _do_extend_by_iter(self, chunk_size):
+        # Collect parts in a list and append them at once, so the content
+        # (and FSM string) is not re-copied for every single part.
         size = 0
-        try:
-            while size < chunk_size:
-                part = self._input.next()
-                size += len(part)
-                self._content += part
-                self._fsm_str += self._make_fsm_str(part)
-        except StopIteration:
-            pass
+        parts = []
+        while size < chunk_size:
+            part = next(self._input, None)
+            if part is None:
+                break # end of input
+            size += len(part)
+            parts.append(part)
+        if parts:
+            self._do_append(''.join(parts))
         return size
 
     def _do_extend_default(self, chunk_size):
@@ -956,18 +1114,20 @@ class LineOrientedBuffer(TokenizerBufferBase):
     .. python::
 
         import re
+        import sys
         from ezmlex.buffers import LineOrientedBuffer
         class MyBuffer(LineOrientedBuffer):
             #
-            _re_comment = re.compile(r'#.*\\n')
-            _re_line = re.compile(r'(?:[^#].*)?\\n')
+            # Comment lines are captured by group 1, other lines by group 2
+            _re_fsm = re.compile(r'(#.*\\n)|((?:[^#].*)?\\n)')
             #
             @classmethod
             def _make_fsm_str(cls, items):
+                match = cls._re_fsm.match
                 def _fsm_char(item):
-                    if cls._re_comment.match(item): return '#'
-                    elif cls._re_line.match(item):  return 'L'
-                    else:                           return 'I'
+                    m = match(item)
+                    if m is None: return 'I'
+                    return '#L'[m.lastindex - 1]
                 #
                 return ''.join(map(_fsm_char, items))
 
@@ -990,7 +1150,7 @@ class LineOrientedBuffer(TokenizerBufferBase):
             elif fsm_str[0] == 'L': id = 'line:      '
             else:                   id = 'incomplete:'
             s = buf.shift(1)
-            print "%d:%d:%s%r" % (s.line_no(), s.col_no(), id, s.__str__())
+            sys.stdout.write("%d:%d:%s%r\\n" % (s.line_no(), s.col_no(), id, s.__str__()))
             if len(buf) == 0:
                 buf.extend() 
         
@@ -1017,7 +1177,6 @@ class LineOrientedBuffer(TokenizerBufferBase):
         TokenizerBufferBase.__init__(self, *args, **kw)
 
     def _on_bind(self, _input):
-        from ezmlex.util import is_string
         if _input is None:
             self._do_extend = self._do_extend_default
             return _input
@@ -1030,13 +1189,15 @@ class LineOrientedBuffer(TokenizerBufferBase):
             return _input
 
         # If it's something that have 'read()' and 'readline()' methods, we'll
-        # read characters in chunks.
-        try:
-            if callable(_input.read) and callable(_input.readline):
-                self._do_extend = self._do_extend_by_read
-                return _input
-        except AttributeError: 
-            pass
+        # read characters in chunks (the bound methods are cached for
+        # _do_extend_by_read()).
+        read = getattr(_input, 'read', None)
+        readline = getattr(_input, 'readline', None)
+        if callable(read) and callable(readline):
+            self._input_read = read
+            self._input_readline = readline
+            self._do_extend = self._do_extend_by_read
+            return _input
 
         # Otherwise we'll try to read input's native portions using iterator
         # interface
@@ -1057,8 +1218,7 @@ class LineOrientedBuffer(TokenizerBufferBase):
     def __str__(self):
         return ''.join(self._content)
 
-    def __unicode__(self):
-        return ''.join(self._content)
+    __unicode__ = __str__
 
     def __len__(self):
         """Returns number of lines in buffer, including the *incomplete line*
@@ -1068,6 +1228,11 @@ class LineOrientedBuffer(TokenizerBufferBase):
     def __getitem__(self, index):
         return self._content[index]
 
+    def _split(self, count):
+        content, fsm_str = self._content, self._fsm_str
+        return content[:count], content[count:], \
+               fsm_str[:count], fsm_str[count:], None, None
+
     def __setitem__(self, index, content):
         self._content[index] = content 
         self._fsm_str[index] = self._make_fsm_str(content)
@@ -1077,7 +1242,7 @@ class LineOrientedBuffer(TokenizerBufferBase):
 
     def _update_end_marker(self):
         nlcnt = len(self._content)
-        if nlcnt and (not self._content[-1].endswith('\n')):
+        if nlcnt and (self._content[-1][-1:] != '\n'):
             nlcnt -= 1
             if(nlcnt == 0):
                 # Our content consists of one incomplete line
@@ -1092,15 +1257,14 @@ class LineOrientedBuffer(TokenizerBufferBase):
             else:
                 # We have buffer with all lines complete
                 self._end_col_no = 0
-        chcnt = sum(map(lambda x : len(x), self._content))
         self._end_line_no = self.line_no() + nlcnt
-        self._end_char_no = self.char_no() + chcnt
+        self._end_char_no = self.char_no() + self._nchars
 
-    def _do_assign(self, content, **kw):
-        from ezmlex.util import is_string, is_list
+    def _do_assign(self, content, fsm_str = None, **kw):
         if content is None:
             self._content = []
             self._fsm_str = self._make_fsm_str([])
+            self._nchars = 0
             return
         if is_string(content):
             self._content = content.splitlines()
@@ -1108,34 +1272,29 @@ class LineOrientedBuffer(TokenizerBufferBase):
             self._content = list(content)
         else:
             self._content = content
-        if 'fsm_str' in kw:
-            self._fsm_str = kw['fsm_str']
+        # Number of characters in buffer, maintained incrementally by
+        # _do_append_lines()
+        self._nchars = sum(map(len, self._content))
+        if fsm_str is not None:
+            self._fsm_str = fsm_str
         else:
             self._fsm_str = self._make_fsm_str(self._content)
             
-    def _do_append_line(self, line):
-        if self._content and (not self._content[-1].endswith('\n')):
-            # concatenate to last line in buffer (the last line
-            # is not complete)
-            self._content[-1] += line
-            self._fsm_str = self._fsm_str[:-1] \
-                          + self._make_fsm_str(self._content[-1:])
-        else:
-            self._content.append(line)
-            self._fsm_str += self._make_fsm_str([line])
+    def _do_append_lines(self, lines):
+        # Append a batch of lines with single call to _make_fsm_str(). The
+        # first line is concatenated to the last line in buffer if the latter
+        # is not complete.
+        if not lines: return
+        self._nchars += sum(map(len, lines))
+        if self._content and (self._content[-1][-1:] != '\n'):
+            lines[0] = self._content.pop() + lines[0]
+            self._fsm_str = self._fsm_str[:-1]
+        self._content.extend(lines)
+        self._fsm_str += self._make_fsm_str(lines)
 
     def _do_append_string_lines(self, string):
         if not string: return
-        lines = string.splitlines(True)
-        if self._content and (not self._content[-1].endswith('\n')):
-            self._content[-1] += lines[0]
-            self._fsm_str = self._fsm_str[:-1] \
-                          + self._make_fsm_str(self._content[-1:])
-            self._content.extend(lines[1:])
-            self._fsm_str += self._make_fsm_str(lines[1:])
-        else:
-            self._content.extend(lines)
-            self._fsm_str += self._make_fsm_str(lines)
+        self._do_append_lines(string.splitlines(True))
 
     def _do_extend_by_string(self, chunk_size):
         # TODO: test it
@@ -1143,10 +1302,8 @@ class LineOrientedBuffer(TokenizerBufferBase):
         end = min(input_len, self._tell + chunk_size)
         if self._tell < end:
             if not (self._input[end-1] == '\n'):
-                try:
-                    end = self._input.index('\n', end-1) + 1
-                except ValueError:
-                    end = input_len
+                # Complete the last line
+                end = self._input.find('\n', end-1) + 1 or input_len
             self._do_append_string_lines(self._input[self._tell : end])
             size = end - self._tell
             self._tell = end
@@ -1155,15 +1312,20 @@ class LineOrientedBuffer(TokenizerBufferBase):
         return size 
 
     def _do_extend_by_read(self, chunk_size):
-        # TODO: test it
-        chunk = self._input.read(chunk_size)
+        chunk = self._input_read(chunk_size)
         if chunk:
-            self._do_append_string_lines(chunk)
+            lines = chunk.splitlines(True)
             size = len(chunk)
             if not (chunk[-1] == '\n'):
-                tail = self._input.readline()
-                self._do_append_string_lines(tail)
-                size += len(tail)
+                # Complete the last line, such that it enters the buffer
+                # together with the chunk
+                tail = self._input_readline()
+                if tail:
+                    tail_lines = tail.splitlines(True)
+                    lines[-1] += tail_lines[0]
+                    lines.extend(tail_lines[1:])
+                    size += len(tail)
+            self._do_append_lines(lines)
         else:
             size = 0
         return size
@@ -1171,15 +1333,18 @@ class LineOrientedBuffer(TokenizerBufferBase):
     def _do_extend_by_iter(self, chunk_size):
         # TODO: test it
         size = 0
-        try:
-            while size < chunk_size:
-                line = self._input.next()
-                if not line:
-                    break # end of input
-                self._do_append_line(line)
-                size += len(line)
-        except StopIteration:
-            pass
+        lines = []
+        while size < chunk_size:
+            line = next(self._input, None)
+            if not line:
+                break # end of input
+            if lines and (lines[-1][-1:] != '\n'):
+                # concatenate to previous line (it is not complete)
+                lines[-1] += line
+            else:
+                lines.append(line)
+            size += len(line)
+        self._do_append_lines(lines)
         return size
 
     def _do_extend_default(self, chunk_size):
@@ -26,60 +26,159 @@ Pattern tables management for tokenizers.
 
 __docformat__ = "restructuredText"
 
+import re
+import sre_parse
+from sre_constants import LITERAL, IN, RANGE, BRANCH, SUBPATTERN, \
+                          MAX_REPEAT, MIN_REPEAT, error as _parse_error
+from ezmlex.util import is_string
+
+_engine = None
+
+def set_engine(engine = None):
+    """Select the regular expression engine used to compile patterns.
+
+    The `engine` must be a module compatible with python's `re` module, for
+    example the third-party ``regex`` module. It must support lookahead
+    assertions, which are used to fuse token patterns (see
+    `ezmlex.tokens.fuse_tokens()`). If `engine` is ``None``, the standard
+    `re` module is used. Only patterns compiled after the call are affected,
+    so the engine should be selected before any grammar is defined.
+    """
+    global _engine
+    _engine = engine
+
+def engine():
+    """Return the regular expression engine selected with `set_engine()`."""
+    if _engine is None:
+        return re
+    return _engine
+
+_compiled = {}
+_MAXCACHE = 1024
+
+def _compile(regex, *args):
+    # Compile `regex` with the selected engine. Compiled expressions are
+    # cached, so that equal patterns produced by ccat(), ccatg(),
+    # recompile() and fuse() are compiled only once. As in `re`, the cache
+    # is cleared when it grows over _MAXCACHE entries.
+    key = (_engine, type(regex), regex) + args
+    try:
+        return _compiled[key]
+    except KeyError:
+        if len(_compiled) >= _MAXCACHE:
+            _compiled.clear()
+        compiled = _compiled[key] = engine().compile(regex, *args)
+        return compiled
+
 def ccat(*reseq):
     """Concatenate sequence of regular expressions into one.
     
     Example
     """
-    import re
-    from ezmlex.util import is_string
-    result = r''
+    parts = []
     for ri in reseq:
         if is_string(ri):
-            result += ri
+            parts.append(ri)
         else:
-            try:
-                # NOTE: If `ri' is not a string, then we expect it is a
-                # compiled regular expression, so it should have `pattern'
-                # attribute and it should be a string (if it's not a string,
-                # the += operator throws TypeError).
-                result += ri.pattern
-            except AttributeError, TypeError:
+            # NOTE: If `ri' is not a string, then we expect it is a
+            # compiled regular expression, so it should have `pattern'
+            # attribute and it should be a string.
+            pattern = getattr(ri, 'pattern', None)
+            if not is_string(pattern):
                 raise TypeError('not a regular expression: %r' % ri)
-    return re.compile(result)
+            parts.append(pattern)
+    return _compile(r''.join(parts))
 
 def ccatg(*reseq):
     """Concatenate sequence of regular expressions and enclose into group"""
-    import re
     return ccat(r'(?:', ccat(*reseq), r')')
 
 def recompile(regex, *args):
-    import re
-    from ezmlex.util import is_string
     try: 
         regex = regex.pattern
     except AttributeError:
         if not is_string(regex):
             raise TypeError("not a pattern: %r" % regex)
-    return re.compile(regex, *args)
+    return _compile(regex, *args)
+
+_generation = 0
+
+def generation():
+    """Return a number, which changes whenever a pattern is defined with
+    `def_pattern()` or deleted with `del_pattern()`. It may be used to
+    invalidate data derived from pattern tables (e.g. fused patterns)."""
+    return _generation
 
 def def_pattern(tab, _id, regex, *args):
-    try: 
+    global _generation
+    if _id in tab:
         p = tab[_id]
-        try: 
-            pp = p.pattern
-            raise RuntimeError("pattern already defined: %r = %r" % (_id, pp))
-        except AttributeError:
-            raise RuntimeError("pattern already defined: %r = %r" % (_id, p))
-    except KeyError:
-        tab[_id] = recompile(regex, *args)
+        raise RuntimeError("pattern already defined: %r = %r" \
+                           % (_id, getattr(p, 'pattern', p)))
+    tab[_id] = recompile(regex, *args)
+    _generation += 1
       
 def del_pattern(tab, _id):
+    global _generation
     del tab[_id]
+    _generation += 1
 
 def pattern(tab, _id):
     return tab[_id]
 
+def first_chars(regex):
+    """Return the set of characters that may start a text matched by `regex`.
+
+    Returns ``None`` if the set can't be determined, e.g. when `regex` may
+    match an empty string, starts with an anchor or character category, is
+    case-insensitive or may start with a non-ASCII character. Also returns
+    ``None`` if an engine other than `re` is selected (see `set_engine()`),
+    as its syntax may not be understood by the standard parser.
+    """
+    if engine() is not re:
+        return None
+    if not hasattr(regex, 'pattern'):
+        regex = recompile(regex)
+    if regex.flags & (re.IGNORECASE | re.LOCALE):
+        return None
+    try:
+        subpattern = sre_parse.parse(regex.pattern, regex.flags)
+    except _parse_error:
+        return None
+    return _first_chars(subpattern)
+
+def _first_chars(subpattern):
+    if not len(subpattern):
+        return None
+    op, av = subpattern[0]
+    if op == LITERAL:
+        if av < 128:
+            return frozenset([chr(av)])
+    elif op == IN:
+        chars = set()
+        for item_op, item_av in av:
+            if item_op == LITERAL and item_av < 128:
+                chars.add(chr(item_av))
+            elif item_op == RANGE and item_av[1] < 128:
+                chars.update(map(chr, range(item_av[0], item_av[1] + 1)))
+            else:
+                return None
+        return frozenset(chars)
+    elif op in (MAX_REPEAT, MIN_REPEAT):
+        if av[0] >= 1:
+            return _first_chars(av[2])
+    elif op == SUBPATTERN:
+        return _first_chars(av[-1])
+    elif op == BRANCH:
+        chars = set()
+        for branch in av[1]:
+            branch_chars = _first_chars(branch)
+            if branch_chars is None:
+                return None
+            chars.update(branch_chars)
+        return frozenset(chars)
+    return None
+
 def find_matching_patterns(tab, *args):
     result = []
     for p_id, p_re in tab.items():
@@ -87,6 +186,55 @@ def find_matching_patterns(tab, *args):
             result.append(p_id)
     return result
 
+# Max number of patterns fused into one expression; python's sre supports
+# at most 100 groups per expression (group 0 included)
+_MAXGROUPS = 99
+
+def fuse(patterns):
+    """Fuse sequence of compiled `patterns` into one regular expression.
+
+    Each pattern is placed within an optional lookahead group, so the
+    resultant expression matches all the patterns at the same position with
+    single call to ``match()``. The (n+1)-th group of the resultant expression
+    captures text matched by the n-th pattern. Returns ``None`` if the
+    patterns can't be fused, i.e. if they are compiled with different flags,
+    define their own groups (which could be back-referenced by number), or
+    there are too many of them (see `_MAXGROUPS`).
+    """
+    if len(patterns) > _MAXGROUPS:
+        return None
+    flags = set([p.flags for p in patterns])
+    if len(flags) > 1 or [p for p in patterns if p.groups]:
+        return None
+    regex = ''.join([r'(?:(?=(%s)))?' % p.pattern for p in patterns])
+    try:
+        return _compile(regex, *flags)
+    except (AssertionError, re.error):
+        # The engine refused the fused expression (e.g. too many groups)
+        return None
+
+def fuse_patterns(tab):
+    """Fuse patterns from ``tab`` with `fuse()`.
+
+    Returns pair ``(regex, ids)``, where the n-th element of ``ids`` is the
+    identifier of pattern captured by (n+1)-th group of ``regex``, or
+    ``None`` if the patterns can't be fused.
+    """
+    items = tab.items()
+    regex = fuse([p_re for p_id, p_re in items])
+    if regex is None:
+        return None
+    return (regex, [p_id for p_id, p_re in items])
+
+def find_fused_patterns(fused, *args):
+    """Same as `find_matching_patterns()` but uses patterns fused by
+    `fuse_patterns()`."""
+    regex, ids = fused
+    m = regex.match(*args)
+    if not m:
+        return []
+    return [ p_id for group, p_id in enumerate(ids) if m.start(group+1) >= 0 ]
+
 # Local Variables:
 # # tab-width:4
 # # indent-tabs-mode:nil
@@ -27,8 +27,14 @@ Please start with the documentation of `TokenizerBase` class.
 __docformat__ = "restructuredText"
 
 import re
-from ezmlex.patterns import ccat, ccatg
-from ezmlex.tokens import TokenBase
+from ezmlex.patterns import ccat, ccatg, \
+        def_pattern as _def_pattern, del_pattern as _del_pattern, \
+        pattern as _pattern, find_matching_patterns, find_fused_patterns, \
+        fuse_patterns, generation as _patterns_generation
+from ezmlex.tokens import TokenBase, \
+        def_token as _def_token, del_token as _del_token, token as _token, \
+        find_matching_tokens, find_fused_tokens, fuse_tokens, \
+        generation as _tokens_generation
 from ezmlex.buffers import LineOrientedBuffer
 
 
@@ -245,13 +251,12 @@ class TokenizerBase(object):
     
     .. python::
 
+            import sys
             from ezmlex.tokenizers import TokenizerBase
             from ezmlex.buffers import CharOrientedBuffer
 
             class Buffer(CharOrientedBuffer):
-                @classmethod
-                def _make_fsm_str(cls,items):
-                    return items
+                _fsm_identity = True
 
             class Tokenizer(TokenizerBase):
                 def _init_buffer(self, *args, **kw):
@@ -272,13 +277,14 @@ class TokenizerBase(object):
             tokenizer = Tokenizer(_input)
 
             # Recognize tokens
+            write = sys.stdout.write
             for token in iter(tokenizer):
                 if token.is_error():
-                    print \"%d:%d:Error:%s:%r\" \\
-                      % (token.line_no(), token.col_no(), token.message(), token.value())
+                    write(\"%d:%d:Error:%s:%r\\n\" \\
+                      % (token.line_no(), token.col_no(), token.message(), token.value()))
                 else:
-                    print \"%d:%d:%s:%r\" \\
-                      % (token.line_no(), token.col_no(), token.id(), token.value())
+                    write(\"%d:%d:%s:%r\\n\" \\
+                      % (token.line_no(), token.col_no(), token.id(), token.value()))
 
     The example may be found in ``examples/apidoc/TokenizerBase1.py``. The
     output from above script shall be::
@@ -396,8 +402,7 @@ class TokenizerBase(object):
             registered. For exception specification, see documentation of
             `ezmlex.patterns.def_pattern()`.
         """
-        from ezmlex.patterns import def_pattern
-        def_pattern(cls.patterns(), *args)
+        _def_pattern(cls.patterns(), *args)
 
     @classmethod
     def del_pattern(cls, *args):
@@ -421,8 +426,7 @@ class TokenizerBase(object):
             not registered. For exception specification, see documentation of
             `ezmlex.patterns.del_pattern()`.
         """
-        from ezmlex.patterns import del_pattern
-        del_pattern(cls.patterns(), *args)
+        _del_pattern(cls.patterns(), *args)
 
     @classmethod
     def pattern(cls, *args):
@@ -446,8 +450,7 @@ class TokenizerBase(object):
             not registered. For exception specification, see documentation of
             `ezmlex.patterns.pattern()`.
         """
-        from ezmlex.patterns import pattern
-        return pattern(cls.patterns(), *args)
+        return _pattern(cls.patterns(), *args)
     @classmethod
     def fsm_char_patterns(cls):
         """Return fsm character patterns registered within tokenizer subclass.
@@ -527,10 +530,9 @@ class TokenizerBase(object):
             registered. For exception specification, see documentation of
             `ezmlex.patterns.def_pattern()`.
         """
-        from ezmlex.patterns import def_pattern, ccat
         if ch == '\0':
             raise RuntimeError('FSM char %s is reserved' % ch)
-        def_pattern(cls.fsm_char_patterns(), ch, ccat('^', regex, '$'), *args)
+        _def_pattern(cls.fsm_char_patterns(), ch, ccat('^', regex, '$'), *args)
 
     @classmethod
     def del_fsm_char_pattern(cls, ch):
@@ -551,8 +553,7 @@ class TokenizerBase(object):
             registered. For exception specification, see documentation of
             `ezmlex.patterns.del_pattern()`.
         """
-        from ezmlex.patterns import del_pattern
-        del_pattern(cls.fsm_char_patterns(), ch)
+        _del_pattern(cls.fsm_char_patterns(), ch)
 
     @classmethod
     def fsm_char_pattern(cls, ch):
@@ -573,13 +574,36 @@ class TokenizerBase(object):
             registered. For exception specification, see documentation of
             `ezmlex.patterns.pattern()`.
         """
-        from ezmlex.patterns import pattern
-        return pattern(cls.fsm_char_patterns(), ch)
+        return _pattern(cls.fsm_char_patterns(), ch)
 
     @classmethod
     def match_fsm_char_patterns(cls, *args):
-        from ezmlex.patterns import find_matching_patterns
-        return find_matching_patterns(cls.fsm_char_patterns(), *args)
+        tab, fused, cache = cls._fsm_char_state()
+        if fused is None:
+            return find_matching_patterns(tab, *args)
+        return find_fused_patterns(fused, *args)
+
+    @classmethod
+    def _fsm_char_state(cls):
+        # Return triple (tab, fused, cache), where tab is the dictionary of FSM
+        # character patterns, fused is a single regular expression matching
+        # all of them (see ezmlex.patterns.fuse_patterns()) and cache is
+        # a dictionary mapping recently seen items to their FSM characters
+        # (see _make_fsm_str_by_patterns()). The fused expression and cache
+        # are rebuilt whenever a pattern is defined or deleted (see
+        # ezmlex.patterns.generation()).
+        tab = cls.fsm_char_patterns()
+        try:
+            fused_tab, fused_generation, fused, cache = \
+                cls._fused_fsm_char_patterns
+        except AttributeError:
+            fused_tab = None
+        if (fused_tab is not tab) \
+        or (fused_generation != _patterns_generation()):
+            fused, cache = fuse_patterns(tab), {}
+            cls._fused_fsm_char_patterns = \
+                (tab, _patterns_generation(), fused, cache)
+        return tab, fused, cache
 
     @classmethod
     def fsm_char(cls, *args):
@@ -589,10 +613,10 @@ class TokenizerBase(object):
         elif len(chars) == 1:
             return chars[0]
         else:
-            raise RuntimeError('internal error: FSM character patterns are ' \
-                             + 'not mutually exclusive.\n' \
-                             + 'Tokenizer: %r\n'\
-                             + 'FSM characters: %r' % (cls, chars))
+            raise RuntimeError(('internal error: FSM character patterns are ' \
+                              + 'not mutually exclusive.\n' \
+                              + 'Tokenizer: %r\n'\
+                              + 'FSM characters: %r') % (cls, chars))
 
     @classmethod
     def token_types(cls):
@@ -604,24 +628,65 @@ class TokenizerBase(object):
 
     @classmethod
     def def_token_type(cls, _id, pattern, *args):
-        from ezmlex.tokens import def_token
-        from ezmlex.patterns import ccat
-        def_token(cls.token_types(), _id, ccat(pattern), *args)
+        _def_token(cls.token_types(), _id, ccat(pattern), *args)
 
     @classmethod
     def del_token_type(cls, _id):
-        from ezmlex.tokens import del_token
-        del_token(cls.token_types(), _id)
+        _del_token(cls.token_types(), _id)
 
     @classmethod
     def token_type(cls, _id):
-        from ezmlex.tokens import token
-        return token(cls.token_types(), _id)
+        return _token(cls.token_types(), _id)
 
     @classmethod
     def match_token_types(cls, *args):
-        from ezmlex.tokens import find_matching_tokens
-        return find_matching_tokens(cls.token_types(), *args)
+        # Token types are preselected with _find_token_types(), only the
+        # matching ones are matched again to get their match objects
+        return [ (_id, Token, Token.match(*args)) \
+                 for _id, Token, length in cls._find_token_types(*args) ]
+
+    @classmethod
+    def _find_token_types(cls, string, pos = 0, *args):
+        # Find token types matching input. Matches all the token patterns
+        # with a single regular expression (see ezmlex.tokens.fuse_tokens())
+        # and returns list of (_id, Token, length) triples. Token types that
+        # can't start with the character found at `pos` (see
+        # TokenBase.first_chars()) are excluded from the fused expression,
+        # so there is one fused expression per starting character. Characters
+        # which can't start any token type with known first characters share
+        # single entry (keyed with None). The fused expressions are rebuilt
+        # whenever a token type is defined or deleted (see
+        # ezmlex.tokens.generation()).
+        tab = cls.token_types()
+        try:
+            fused_tab, fused_generation, fused_by_char, known_chars = \
+                cls._fused_token_types
+        except AttributeError:
+            fused_tab = None
+        if (fused_tab is not tab) \
+        or (fused_generation != _tokens_generation()):
+            fused_by_char = {}
+            known_chars = set()
+            for Token in tab.values():
+                known_chars.update(Token.first_chars() or ())
+            cls._fused_token_types = \
+                (tab, _tokens_generation(), fused_by_char, known_chars)
+        ch = string[pos:pos+1]
+        if ch not in known_chars:
+            ch = None
+        try:
+            subtab, fused = fused_by_char[ch]
+        except KeyError:
+            subtab = dict([ (_id, Token) for _id, Token in tab.items() \
+                            if Token.first_chars() is None \
+                            or ch in Token.first_chars() ])
+            fused = fuse_tokens(subtab)
+            fused_by_char[ch] = (subtab, fused)
+        if fused is None:
+            return [ (_id, Token, match.end() - match.start()) \
+                     for _id, Token, match \
+                     in find_matching_tokens(subtab, string, pos, *args) ]
+        return find_fused_tokens(fused, string, pos, *args)
 
     @classmethod
     def error_types(cls):
@@ -633,27 +698,47 @@ class TokenizerBase(object):
 
     @classmethod
     def def_error_type(cls, _id, pattern, message, *args):
-        from ezmlex.tokens import def_token, token
-        from ezmlex.patterns import ccat
         tab = cls.error_types()
-        def_token(tab, _id, pattern, _id, *args)
-        token(tab, _id).is_error = lambda cls : True
-        token(tab, _id).message = lambda cls : message
+        _def_token(tab, _id, pattern, _id, *args)
+        _token(tab, _id).is_error = lambda cls : True
+        _token(tab, _id).message = lambda cls : message
 
     @classmethod
     def del_error_type(cls, _id):
-        from ezmlex.tokens import del_token
-        del_token(cls.error_types(), _id)
+        _del_token(cls.error_types(), _id)
 
     @classmethod
     def error_type(cls, _id):
-        from ezmlex.tokens import token
-        return token(cls.error_types(), _id)
+        return _token(cls.error_types(), _id)
 
     @classmethod
     def match_error_types(cls, *args):
-        from ezmlex.tokens import find_matching_tokens
-        return find_matching_tokens(cls.error_types(), *args)
+        # Error types are preselected with _find_error_types(), only the
+        # matching ones are matched again to get their match objects
+        return [ (_id, Error, Error.match(*args)) \
+                 for _id, Error, length in cls._find_error_types(*args) ]
+
+    @classmethod
+    def _find_error_types(cls, *args):
+        # Find error types matching input. Matches all the error patterns
+        # with a single regular expression (see ezmlex.tokens.fuse_tokens())
+        # and returns list of (_id, Error, length) triples. The fused
+        # expression is rebuilt whenever a token or error type is defined or
+        # deleted (see ezmlex.tokens.generation()).
+        tab = cls.error_types()
+        try:
+            fused_tab, fused_generation, fused = cls._fused_error_types
+        except AttributeError:
+            fused_tab = None
+        if (fused_tab is not tab) \
+        or (fused_generation != _tokens_generation()):
+            fused = fuse_tokens(tab)
+            cls._fused_error_types = (tab, _tokens_generation(), fused)
+        if fused is None:
+            return [ (_id, Error, match.end() - match.start()) \
+                     for _id, Error, match \
+                     in find_matching_tokens(tab, *args) ]
+        return find_fused_tokens(fused, *args)
 
     def __init__(self, _input = None, line_no = 0, col_no = 0, char_no = 0):
         """Constructor.
@@ -707,10 +792,16 @@ class TokenizerBase(object):
         self._get_buffer().bind(_input)
 
     def __iter__(self):
-        tok = self.token()
-        while tok is not None:
-            yield tok
-            tok = self.token()
+        return iter(self.token, None)
+
+    def tokens(self):
+        """Read all remaining tokens from input.
+
+        :Return:
+            list of tokens, as they would be returned by subsequent calls to
+            `token()`, up to the end of input
+        """
+        return list(iter(self.token, None))
 
     _max_lookahead = 1
     _max_iterations = 1000000
@@ -728,32 +819,33 @@ class TokenizerBase(object):
         """
         eoi = False
         buff = self._get_buffer()
-        iter_counter = 0
-        while iter_counter < self._max_iterations:
-            iter_counter += 1
+        # Bind things used on every iteration to locals
+        extend = buff.extend
+        default_chunk = buff._default_chunk
+        max_lookahead = self._max_lookahead
+        match_token_types = self.match_token_types
+        for iter_counter in xrange(self._max_iterations):
             # Assure, than there is at least _max_lookahead characters
             # in the buffer (except we are approaching end of input)
-            while (not eoi) and (len(buff) < self._max_lookahead):
-                eoi = (buff.extend() < buff._default_chunk)
+            while (not eoi) and (len(buff) < max_lookahead):
+                eoi = (extend() < default_chunk)
 
-            # If there is no content to scan, return None
-            if len(buff) == 0:
-                return None
-                
+            # The FSM string has one character per buffer item.
             fsm_str = buff.fsm_str()
             fsm_str_len = len(fsm_str)
 
-            assert(fsm_str_len == len(buff))
-            assert(fsm_str_len > 0)
+            # If there is no content to scan, return None
+            if fsm_str_len == 0:
+                return None
 
             # Look for tokens matching the current FSM string starting
             # at its beginning. The match_list is a list of matching
-            # tokens in form [(id0, Token0, match0), (id1, Token1,
-            # match1), ...], where idN is an identifier of given token,
+            # tokens in form [(id0, Token0, m0), (id1, Token1,
+            # m1), ...], where idN is an identifier of given token,
             # TokenN is tokens's type, such that you may create instance
-            # with token = TokenN(...), and matchN is MatchObject returned
-            # by re.match().
-            match_list = self.match_token_types(fsm_str)
+            # with token = TokenN(...), and mN is the match object of FSM
+            # string matched by TokenN.
+            match_list = match_token_types(fsm_str)
             match_list_len = len(match_list)
             if match_list_len == 0:
                 # If no token matches current input, then we must emit
@@ -761,89 +853,107 @@ class TokenizerBase(object):
                 # that enters the returned error token.
                 return self._error_token(fsm_str)
             elif match_list_len > 0:
-                # Extract lengths of match objects from match_list
-                match_len_list = map(lambda m : len(m[2].group(0)), match_list)
-                # How many tokens matching whole buffer?
-                whole_match_count = match_len_list.count(fsm_str_len)
+                # Find in one pass: the number of tokens matching whole
+                # buffer, the longest match, its index and the number of
+                # tokens of that length
+                whole_match_count = 0
+                match_len_max = -1
+                match_len_max_count = 0
+                for i, (_id, Token, match) in enumerate(match_list):
+                    length = match.end() - match.start()
+                    if length == fsm_str_len:
+                        whole_match_count += 1
+                    if length > match_len_max:
+                        match_len_max = length
+                        match_len_max_count = 1
+                        index = i
+                    elif length == match_len_max:
+                        match_len_max_count += 1
                 if (whole_match_count == 0) or eoi:
                     # We have only tokens matching substrings of FSM string but
                     # no token matches whole string. It is, all these tokens
                     # are complete, and all of them are candidates for the
                     # token to be returned. We chose (the longest) one and
                     # return it.
-                    match_len_max = max(match_len_list)
-                    match_len_max_count = match_len_list.count(match_len_max)
                     if match_len_max_count > 1:
                         # If there is more than one "longest token", then this
                         # is ambiguity, and we should indicate an error.
                         # Interpret this, as incomplete token (which could be
                         # disambiguated with few more characters).
                         return self._error_token(fsm_str) 
-                    elif match_len_max_count == 1:
-                        index = match_len_list.index(match_len_max)
+                    else:
                         _id, Token, match =  match_list[index]
                         s = buff.shift(match_len_max)
-                        token = Token(s.line_no(), s.col_no(), s.char_no())
-                        token.set_value(s.__str__())
-                        return token
-                    else:
-                        raise RuntimeError(
-                            'internal error: unexpected situation in '\
-                          + 'tokenizer: %d tokens recognized, ' \
-                          + 'but %d tokens would have maximum length' \
-                          % (match_list_len, match_len_max_count))
-                elif whole_match_count > 0: # and not eoi
+                        return Token(s.line_no(), s.col_no(), s.char_no(),
+                                     s.__str__())
+                else: # whole_match_count > 0 and not eoi
                     # read more characters from input and let the loop to try
                     # to recover complete token
-                    eoi = (buff.extend() < buff._default_chunk)
-                else:
-                    raise RuntimeError(
-                        'internal error: we found %d tokens matching whole ' \
-                        'buffer (a number less than zero!)' \
-                        % whole_match_count ) 
+                    eoi = (extend() < default_chunk)
             else:
                 raise RuntimeError('internal error: number of ' \
                                  + 'candidates for token less than ' \
                                  + 'zero: %d' % match_list_len)
 
         raise RuntimeError('internal error: loop interrupted at iteration %d' \
-                         % iter_counter )
+                         % self._max_iterations )
 
     def _error_token(self, fsm_str):
         # Return error token matching the input
         match_list = self.match_error_types(fsm_str)
         if len(match_list) > 1:
             slice_end = min(self._max_lookahead, len(fsm_str))
-            raise RuntimeError('internal error: can\'t determine error ' \
-                             + 'type for FSM string starting with %r.\n' \
-                             + 'The matching errors are: %r.\n' \
-                             + 'Revise error definitions for the tokenizer.'\
-                             % (fsm_str[:slice_end], match_list) )
+            raise RuntimeError(('internal error: can\'t determine error ' \
+                              + 'type for FSM string starting with %r.\n' \
+                              + 'The matching errors are: %r.\n' \
+                              + 'Revise error definitions for the tokenizer.')\
+                              % (fsm_str[:slice_end], \
+                                 [ _id for _id, Error, m in match_list ]) )
         elif len(match_list) < 1:
             slice_end = min(self._max_lookahead, len(fsm_str))
-            raise RuntimeError('internal error: can\'t determine error ' \
-                             + 'type for FSM string starting with %r.\n' \
-                             + 'No matching errors found.\n' \
-                             + 'Revise error definitions for the tokenizer.'\
-                             % fsm_str[:slice_end] )
+            raise RuntimeError(('internal error: can\'t determine error ' \
+                              + 'type for FSM string starting with %r.\n' \
+                              + 'No matching errors found.\n' \
+                              + 'Revise error definitions for the tokenizer.')\
+                              % fsm_str[:slice_end] )
         else:
             _id, Error, match = match_list[0]
-            s = self._get_buffer().shift(len(match.group(0)))
-            token = Error(s.line_no(), s.col_no(), s.char_no())
-            token.set_value(s.__str__())
-            return token
+            s = self._get_buffer().shift(match.end() - match.start())
+            return Error(s.line_no(), s.col_no(), s.char_no(), s.__str__())
 
     def _init_buffer(self, *args, **kw):
         raise NotImplementedError("this method is abstract")
 
+    # Set by _init_buffer()
+    _buffer = None
+
     def _get_buffer(self):
-        if not hasattr(self, '_buffer'):
+        buff = self._buffer
+        if buff is None:
             self._init_buffer()
-        return self._buffer
+            buff = self._buffer
+        return buff
+
+    # Max number of items cached by _make_fsm_str_by_patterns()
+    _fsm_char_cache_size = 1024
 
     @classmethod
     def _make_fsm_str_by_patterns(cls, lines):
-        return ''.join(map(cls.fsm_char, lines))
+        # Repeated lines (empty lines, separators, ...) are not matched against
+        # patterns again; their FSM characters are taken from cache.
+        tab, fused, cache = cls._fsm_char_state()
+        fsm_char = cls.fsm_char
+        chars = []
+        for line in lines:
+            try:
+                ch = cache[line]
+            except KeyError:
+                ch = fsm_char(line)
+                if len(cache) >= cls._fsm_char_cache_size:
+                    cache.clear()
+                cache[line] = ch
+            chars.append(ch)
+        return ''.join(chars)
 
 # Local Variables:
 # # tab-width:4
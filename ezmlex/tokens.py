@@ -26,8 +26,13 @@ TODO: Write docs for `ezmlex.tokens` module
 
 __docformat__ = "restructuredText"
 
+from ezmlex.patterns import recompile, first_chars, fuse
+
 class TokenBase(object):
 
+    # Tokens are created in large numbers, don't give them __dict__
+    __slots__ = ('_line_no', '_col_no', '_char_no', '_value')
+
     @classmethod
     def id(cls):
         return cls._id
@@ -40,10 +45,16 @@ class TokenBase(object):
     def pattern(cls):
         return cls._pattern
 
+    @classmethod
+    def first_chars(cls):
+        return cls._first_chars
+
     @classmethod
     def _set_pattern(cls, pattern, *args):
-        from ezmlex.patterns import recompile
         cls._pattern = recompile(pattern, *args)
+        cls._first_chars = first_chars(cls._pattern)
+        # Bypass the generic match() below
+        cls.match = staticmethod(cls._pattern.match)
             
     @classmethod
     def match(cls, *args):
@@ -57,10 +68,11 @@ class TokenBase(object):
     def message(cls):
         return ''
 
-    def __init__(self, line_no, col_no, char_no):
+    def __init__(self, line_no, col_no, char_no, value = None):
         self._line_no = line_no
         self._col_no = col_no
         self._char_no = char_no
+        self._value = value
 
     def line_no(self):
         return self._line_no
@@ -83,20 +95,30 @@ class TokenBase(object):
     def set_value(self, value):
         self._value = value
 
+_generation = 0
+
+def generation():
+    """Return a number, which changes whenever a token is defined with
+    `def_token()` or deleted with `del_token()`. It may be used to invalidate
+    data derived from token tables (e.g. fused patterns)."""
+    return _generation
+
 def def_token(tab, _id, pattern, name=None, *args):
-    try: 
-        Token = tab[_id]
-        raise RuntimeError("token already defined: %r = %r" % (_id, Token))
-    except KeyError:
-        if name is None: name = _id
-        class Token(TokenBase): pass
-        Token._set_id(_id)
-        Token._set_pattern(pattern, *args)
-        Token.__name__ = name + "Token" # for debugging
-        tab[_id] = Token
+    global _generation
+    if _id in tab:
+        raise RuntimeError("token already defined: %r = %r" % (_id, tab[_id]))
+    if name is None: name = _id
+    class Token(TokenBase): __slots__ = ()
+    Token._set_id(_id)
+    Token._set_pattern(pattern, *args)
+    Token.__name__ = name + "Token" # for debugging
+    tab[_id] = Token
+    _generation += 1
 
 def del_token(tab, _id):
+    global _generation
     del tab[_id]
+    _generation += 1
 
 def token(tab, _id):
     return tab[_id]
@@ -108,6 +130,39 @@ def find_matching_tokens(tab, *args):
         if t_match:
             result.append((t_id, t_class, t_match))
     return result
+
+def fuse_tokens(tab):
+    """Fuse patterns of all tokens from ``tab`` into one regular expression.
+
+    Each token pattern is placed within an optional lookahead group, so the
+    resultant expression matches all the patterns at the same position with
+    single call to ``match()``. Returns pair ``(regex, tokens)``, where
+    ``tokens`` is a list of ``(_id, Token)`` pairs, the n-th pair corresponding
+    to the (n+1)-th group of ``regex``. Returns ``None`` if the patterns
+    can't be fused, i.e. if they are compiled with different flags or define
+    their own groups (which could be back-referenced by number).
+    """
+    tokens = tab.items()
+    regex = fuse([t_class.pattern() for t_id, t_class in tokens])
+    if regex is None:
+        return None
+    return (regex, tokens)
+
+def find_fused_tokens(fused, *args):
+    """Same as `find_matching_tokens()` but uses patterns fused by
+    `fuse_tokens()`. Returns list of ``(_id, Token, length)`` triples, where
+    ``length`` is the length of text matched by ``Token``."""
+    regex, tokens = fused
+    m = regex.match(*args)
+    if not m:
+        return []
+    span = m.span
+    result = []
+    for group, (t_id, t_class) in enumerate(tokens):
+        start, end = span(group + 1)
+        if start >= 0:
+            result.append((t_id, t_class, end - start))
+    return result
      
 
 # Local Variables:
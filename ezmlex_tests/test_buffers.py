@@ -30,6 +30,7 @@ __docformat__ = "restructuredText"
 
 
 from unittest import TestCase
+from StringIO import StringIO
 from mock import Mock, MagicMock, patch
 from ezmlex.buffers import TokenizerBufferBase
 from ezmlex.buffers import CharOrientedBuffer
@@ -217,26 +218,24 @@ class Test_TokenizerBufferBase_shift(TestCase):
     def _make_mock_dicts_1(self, content):
         # NOTE: bookmarking values are chosen ad hoc, as they are not
         # important here. The important is that they should differ mutually.
-        tb = {  'init'       : Mock(return_value = None), 
-                'end_line_no': Mock(return_value = 10),
-                'end_col_no' : Mock(return_value = 11),
-                'end_char_no': Mock(return_value = 12),
-                'getitem'    : Mock(side_effect = lambda i : content[i]) }
-        sb = {  'line_no'    : Mock(return_value = 31),
-                'col_no'     : Mock(return_value = 32),
-                'char_no'    : Mock(return_value = 33),
-                'end_line_no': Mock(return_value = 41),
-                'end_col_no' : Mock(return_value = 42),
-                'end_char_no': Mock(return_value = 43),
-                'fsm_str'    : Mock(return_value = content.lower()) }
+        tb = {  'init'        : Mock(return_value = None), 
+                '_end_line_no': 10,
+                '_end_col_no' : 11,
+                '_end_char_no': 12,
+                'getitem'     : Mock(side_effect = lambda i : content[i]) }
+        sb = {  '_line_no'    : 31,
+                '_col_no'     : 32,
+                '_char_no'    : 33,
+                'fsm_str'     : Mock(return_value = content.lower()) }
         return tb, sb
 
-    # Test if buffer object (head) returned by shift() was created with
-    # correct arguments (we just check the call to head's __init__())
-    def test_shift_calls___init___1(self, *args):
-        "TokenizerBufferBase: head = buf.shift(ns) initializes head with " \
-        "TokenizerBufferBase(None,buf.line_no(),buf.col_no()," \
-        "buf.char_no(),buf[:ns],fsm_str=buf.fsm_str()[:ns])"
+    # Test if buffer object (head) returned by shift() was set up with
+    # correct content and start marker (without calling head's __init__())
+    def test_shift_initializes_head_1(self, *args):
+        "TokenizerBufferBase: head = buf.shift(ns) bypasses __init__(), " \
+        "calls head._do_assign(buf[:ns],fsm_str=buf.fsm_str()[:ns]," \
+        "nlines=None) and " \
+        "copies buf's start marker to head"
         from random import seed,randint,choice
         from string import letters
         seed()
@@ -245,30 +244,40 @@ class Test_TokenizerBufferBase_shift(TestCase):
         for ns in range(0,len(content)):
             tb, sb = self._make_mock_dicts_1(content)
             with patch.object(TBB, '__init__', tb['init']),\
-                 patch.object(TBB, 'end_line_no', tb['end_line_no']), \
-                 patch.object(TBB, 'end_col_no', tb['end_col_no']), \
-                 patch.object(TBB, 'end_char_no', tb['end_char_no']), \
+                 patch.object(TBB, '_do_assign'),\
+                 patch.object(TBB, '_update_end_marker'),\
+                 patch.object(TBB, '_end_line_no', tb['_end_line_no'],
+                              create = True), \
+                 patch.object(TBB, '_end_col_no', tb['_end_col_no'],
+                              create = True), \
+                 patch.object(TBB, '_end_char_no', tb['_end_char_no'],
+                              create = True), \
                  patch.object(TBB, '__getitem__', tb['getitem']),\
-                 patch.object(TBB, 'assign'), \
-                 patch.object(self._buffer, 'line_no', sb['line_no']),\
-                 patch.object(self._buffer, 'col_no', sb['col_no']),\
-                 patch.object(self._buffer, 'char_no', sb['char_no']),\
-                 patch.object(self._buffer, 'end_line_no', sb['end_line_no']),\
-                 patch.object(self._buffer, 'end_col_no', sb['end_col_no']),\
-                 patch.object(self._buffer, 'end_char_no', sb['end_char_no']),\
+                 patch.object(self._buffer, '_line_no', sb['_line_no'],
+                              create = True),\
+                 patch.object(self._buffer, '_col_no', sb['_col_no'],
+                              create = True),\
+                 patch.object(self._buffer, '_char_no', sb['_char_no'],
+                              create = True),\
                  patch.object(self._buffer, 'fsm_str', sb['fsm_str']),\
-                 patch.object(self._buffer, 'assign'):
+                 patch.object(self._buffer, '_do_assign'),\
+                 patch.object(self._buffer, 'set_start_marker'):
                 head = self._buffer.shift(ns)
-                head.__init__.assert_called_once_with(None,
-                    self._buffer.line_no(), self._buffer.col_no(),
-                    self._buffer.char_no(), self._buffer[:ns], fsm_str =
-                    self._buffer.fsm_str()[:ns])
-
-    # Test if the buffer is re-assigned() with correct arguments during shift()
+                self.assertFalse(tb['init'].called)
+                head._do_assign.assert_called_once_with(self._buffer[:ns],
+                    fsm_str = self._buffer.fsm_str()[:ns], nlines = None)
+                self.assertEqual((head._line_no, head._col_no, head._char_no),
+                    (self._buffer._line_no, self._buffer._col_no,
+                     self._buffer._char_no))
+                head._update_end_marker.assert_called_once_with()
+
+    # Test if the buffer is re-assigned with correct arguments during shift()
     def test_shift_calls_assign_1(self, *args):
         "TokenizerBufferBase: head = buf.shift(ns) re-assigns buf with " \
-        "buf.assign(head.end_line_no(),head.end_col_no()," \
-        "head.end_char_no(),buf[ns:],fsm_str = buf.fsm_str()[ns:])"
+        "buf._do_assign(buf[ns:],fsm_str = buf.fsm_str()[ns:]," \
+        "nlines = None) and " \
+        "buf.set_start_marker(head._end_line_no,head._end_col_no," \
+        "head._end_char_no)"
         from random import seed,randint,choice
         from string import letters
         seed()
@@ -276,23 +285,31 @@ class Test_TokenizerBufferBase_shift(TestCase):
         TBB = TokenizerBufferBase
         for ns in range(0,len(content)):
             tb, sb = self._make_mock_dicts_1(content)
-            with patch.object(TBB, 'end_line_no', tb['end_line_no']), \
-                 patch.object(TBB, 'end_col_no', tb['end_col_no']), \
-                 patch.object(TBB, 'end_char_no', tb['end_char_no']), \
+            with patch.object(TBB, '__init__', tb['init']),\
+                 patch.object(TBB, '_do_assign'),\
+                 patch.object(TBB, '_update_end_marker'),\
+                 patch.object(TBB, '_end_line_no', tb['_end_line_no'],
+                              create = True), \
+                 patch.object(TBB, '_end_col_no', tb['_end_col_no'],
+                              create = True), \
+                 patch.object(TBB, '_end_char_no', tb['_end_char_no'],
+                              create = True), \
                  patch.object(TBB, '__getitem__', tb['getitem']),\
-                 patch.object(TBB, 'assign'), \
-                 patch.object(self._buffer, 'line_no', sb['line_no']),\
-                 patch.object(self._buffer, 'col_no', sb['col_no']),\
-                 patch.object(self._buffer, 'char_no', sb['char_no']),\
-                 patch.object(self._buffer, 'end_line_no', sb['end_line_no']),\
-                 patch.object(self._buffer, 'end_col_no', sb['end_col_no']),\
-                 patch.object(self._buffer, 'end_char_no', sb['end_char_no']),\
+                 patch.object(self._buffer, '_line_no', sb['_line_no'],
+                              create = True),\
+                 patch.object(self._buffer, '_col_no', sb['_col_no'],
+                              create = True),\
+                 patch.object(self._buffer, '_char_no', sb['_char_no'],
+                              create = True),\
                  patch.object(self._buffer, 'fsm_str', sb['fsm_str']),\
-                 patch.object(self._buffer, 'assign'):
+                 patch.object(self._buffer, '_do_assign'),\
+                 patch.object(self._buffer, 'set_start_marker'):
                 head = self._buffer.shift(ns)
-                self._buffer.assign.assert_called_once_with(head.end_line_no(),
-                    head.end_col_no(), head.end_char_no(), self._buffer[ns:], 
-                    fsm_str = self._buffer.fsm_str()[ns:])
+                self._buffer._do_assign.assert_called_once_with(
+                    self._buffer[ns:], fsm_str = self._buffer.fsm_str()[ns:],
+                    nlines = None)
+                self._buffer.set_start_marker.assert_called_once_with(
+                    head._end_line_no, head._end_col_no, head._end_char_no)
 #############################################################################
 
 #############################################################################
@@ -434,6 +451,130 @@ class Test_CharOrientedBuffer_shift(TestCase):
         "CharOrientedBuffer.shift equals TokenizerBufferBase.shift"
         # NOTE: this is valid until CharOrientedBuffer.shift() is not defined
         self.assertEqual(CharOrientedBuffer.shift, TokenizerBufferBase.shift)
+
+    def test_shift_uses_new_shifted(self):
+        "CharOrientedBuffer: head = buf.shift(n) creates head with " \
+        "buf._new_shifted()"
+        class Buffer(CharOrientedBuffer):
+            _fsm_identity = True
+            def __init__(self, *args, **kw):
+                CharOrientedBuffer.__init__(self, *args, **kw)
+                self.extra = 'extra'
+        class Buffer2(Buffer):
+            @classmethod
+            def _new_shifted(cls):
+                s = super(Buffer2, cls)._new_shifted()
+                s.extra = 'extra'
+                return s
+        head = Buffer(None, 1, 2, 3, 'ab\ncd').shift(4)
+        self.assertIs(type(head), Buffer)
+        self.assertIsNone(head._input)
+        self.assertFalse(hasattr(head, 'extra'))
+        head = Buffer2(None, 1, 2, 3, 'ab\ncd').shift(4)
+        self.assertIs(type(head), Buffer2)
+        self.assertEqual(head.extra, 'extra')
+        self.assertEqual(str(head), 'ab\nc')
+        self.assertEqual((head.line_no(), head.col_no(), head.char_no()),
+                         (1, 2, 3))
+#############################################################################
+
+#############################################################################
+# Test: CharOrientedBuffer: _split()
+#############################################################################
+class Test_CharOrientedBuffer__split(TestCase):
+    def test_split_1(self):
+        "CharOrientedBuffer: buf._split(n) returns head, tail, their FSM " \
+        "strings and their line counts"
+        with patch.object(CharOrientedBuffer, '_make_fsm_str',
+                          side_effect = lambda x : x.upper()):
+            buf = CharOrientedBuffer(None, 0, 0, 0, 'ab\ncd\n\nef')
+            for n in range(len(buf) + 1):
+                self.assertEqual(buf._split(n),
+                    (str(buf)[:n], str(buf)[n:],
+                     buf.fsm_str()[:n], buf.fsm_str()[n:],
+                     str(buf)[:n].count('\n'), str(buf)[n:].count('\n')))
+
+    def test_shift_sets_nlines_1(self):
+        "CharOrientedBuffer: head = buf.shift(n) sets line counts of head " \
+        "and buf from buf._split(n)"
+        with patch.object(CharOrientedBuffer, '_fsm_identity', True):
+            buf = CharOrientedBuffer(None, 0, 0, 0, 'ab\ncd\n\nef')
+            head = buf.shift(4)
+            self.assertEqual((head._nlines, buf._nlines), (1, 2))
+            self.assertEqual((buf.line_no(), buf.col_no()), (1, 1))
+            self.assertEqual((buf.end_line_no(), buf.end_col_no()), (3, 2))
+#############################################################################
+
+#############################################################################
+# Test: CharOrientedBuffer: shift_chunks()
+#############################################################################
+class Test_CharOrientedBuffer_shift_chunks(TestCase):
+    _content = 'Lorem ipsum\ndolor sit amet,\n\nconsectetur\nadipiscing elit.'
+
+    def _check_against_shift(self, size):
+        buf1 = CharOrientedBuffer(self._content, 1, 2, 3)
+        buf2 = CharOrientedBuffer(self._content, 1, 2, 3)
+        while True:
+            n1 = buf1.extend(7)
+            n2 = buf2.extend(7)
+            self.assertEqual(n1, n2)
+            chunks1 = []
+            while len(buf1) >= size:
+                s = buf1.shift(size)
+                chunks1.append((s.line_no(), s.col_no(), s.char_no(), str(s)))
+            chunks2 = buf2.shift_chunks(size)
+            self.assertEqual(chunks2, chunks1)
+            self.assertEqual(str(buf2), str(buf1))
+            self.assertEqual(buf2.fsm_str(), buf1.fsm_str())
+            self.assertEqual(
+                (buf2.line_no(), buf2.col_no(), buf2.char_no()),
+                (buf1.line_no(), buf1.col_no(), buf1.char_no()))
+            self.assertEqual(
+                (buf2.end_line_no(), buf2.end_col_no(), buf2.end_char_no()),
+                (buf1.end_line_no(), buf1.end_col_no(), buf1.end_char_no()))
+            if not n1:
+                break
+
+    def test_shift_chunks_equals_shift_1(self):
+        "CharOrientedBuffer: buf.shift_chunks(n) gives same chunks, " \
+        "markers, tail and fsm_str as repeated buf.shift(n)"
+        with patch.object(CharOrientedBuffer, '_make_fsm_str',
+                          side_effect = lambda x : x.upper()):
+            for size in [1, 3, 8, 50, 1000]:
+                self._check_against_shift(size)
+
+    def test_shift_chunks_equals_shift_identity_1(self):
+        "CharOrientedBuffer: with _fsm_identity, buf.shift_chunks(n) gives " \
+        "same chunks, markers, tail and fsm_str as repeated buf.shift(n)"
+        with patch.object(CharOrientedBuffer, '_fsm_identity', True):
+            for size in [1, 3, 8, 50, 1000]:
+                self._check_against_shift(size)
+
+    def test_shift_chunks_keeps_short_tail_1(self):
+        "CharOrientedBuffer: buf.shift_chunks(n) leaves buf unchanged, " \
+        "when len(buf) < n"
+        with patch.object(CharOrientedBuffer, '_make_fsm_str',
+                          side_effect = lambda x : x.upper()):
+            buf = CharOrientedBuffer(None, 1, 2, 3, 'ab\nc')
+            self.assertEqual(buf.shift_chunks(5), [])
+            self.assertEqual(str(buf), 'ab\nc')
+            self.assertEqual(buf.fsm_str(), 'AB\nC')
+            self.assertEqual((buf.line_no(), buf.col_no(), buf.char_no()),
+                             (1, 2, 3))
+
+    def test_shift_chunks_non_positive_size_1(self):
+        "CharOrientedBuffer: buf.shift_chunks(n) raises ValueError and " \
+        "leaves buf unchanged, when n <= 0"
+        with patch.object(CharOrientedBuffer, '_make_fsm_str',
+                          side_effect = lambda x : x.upper()):
+            buf = CharOrientedBuffer(None, 1, 2, 3, 'ab\nc')
+            for size in [0, -1, -5]:
+                with self.assertRaises(ValueError):
+                    buf.shift_chunks(size)
+                self.assertEqual(str(buf), 'ab\nc')
+                self.assertEqual(buf.fsm_str(), 'AB\nC')
+                self.assertEqual((buf.line_no(), buf.col_no(), buf.char_no()),
+                                 (1, 2, 3))
 #############################################################################
 
 #############################################################################
@@ -581,6 +722,27 @@ class Test_CharOrientedTokenizer__on_bind(TestCase):
         rv = buf._on_bind(iterable)
         self.assertEqual(tuple(rv), tuple(iter(iterable)))
         self.assertEqual(buf._do_extend, buf._do_extend_by_iter)
+    def test__onbind_caches_read(self, *args):
+        "CharOrientedBuffer: buf._on_bind(readable) caches readable.read " \
+        "for buf._do_extend_by_read()"
+        class Readable(object):
+            def read(self): pass
+        buf = CharOrientedBuffer()
+        readable = Readable()
+        buf._on_bind(readable)
+        self.assertEqual(buf._input_read, readable.read)
+    def test__onbind_read_not_callable(self, *args):
+        "CharOrientedBuffer: buf._on_bind(obj) sets " \
+        "buf._do_extend = buf._do_extend_by_iter, if obj.read is not " \
+        "callable"
+        class NotCallable(object):
+            read = 'abc'
+            def __iter__(self): return iter(['abc'])
+        buf = CharOrientedBuffer()
+        rv = buf._on_bind(NotCallable())
+        self.assertEqual(tuple(rv), ('abc',))
+        self.assertEqual(buf._do_extend, buf._do_extend_by_iter)
+        self.assertFalse(hasattr(buf, '_input_read'))
 #############################################################################
         
 #############################################################################
@@ -685,8 +847,18 @@ class Test_CharOrientedBuffer__do_extend_by_read(TestCase):
     def test__doextendbyread_1(self,*args):
         "CharOrientedBuffer: buf._do_extend_by_read() works for some " \
         "simple test fixtures"
+        _input = '0123456789'
         buf = CharOrientedBuffer()
-        # TODO: write this test
+        buf.bind(StringIO(_input))
+        self.assertEqual(buf._do_extend_by_read(3), 3) # full chunk
+        self.assertEqual(buf[:], _input[:len(buf)])
+        self.assertEqual(buf._do_extend_by_read(6), 6) # full chunk
+        self.assertEqual(buf[:], _input[:len(buf)])
+        self.assertEqual(buf._do_extend_by_read(3), 1) # tail
+        self.assertEqual(buf[:], _input)
+        self.assertEqual(buf._do_extend_by_read(3), 0) # end of input
+        self.assertEqual(buf[:], _input)
+        self.assertEqual(buf._fsm_str, buf._content)
 #############################################################################
 
 #############################################################################
@@ -736,6 +908,37 @@ class Test_CharOrientedBuffer__do_extend_by_iter(TestCase):
         self.assertEqual(buf._fsm_str, buf._content)
         buf._do_extend_by_iter(1)
         self.assertEqual(buf._fsm_str, buf._content)
+
+    def test__doextendbyiter_appends_once(self,*args):
+        "CharOrientedBuffer: buf._do_extend_by_iter() joins parts read " \
+        "from iterator and appends them with single buf._do_append() call"
+        _input = [ '012', '345', '678' , '9' ]
+        buf = CharOrientedBuffer()
+        buf.bind(_input)
+        with patch.object(CharOrientedBuffer, '_do_append') as method:
+            self.assertEqual(buf._do_extend_by_iter(7), 9)
+            method.assert_called_once_with('012345678')
+        with patch.object(CharOrientedBuffer, '_do_append') as method:
+            self.assertEqual(buf._do_extend_by_iter(7), 1)
+            method.assert_called_once_with('9')
+        with patch.object(CharOrientedBuffer, '_do_append') as method:
+            self.assertEqual(buf._do_extend_by_iter(7), 0)
+            self.assertFalse(method.called)
+
+    def test__doextendbyiter_end_of_input(self,*args):
+        "CharOrientedBuffer: buf._do_extend_by_iter() returns 0 and leaves " \
+        "buf unchanged at the end of iterator input"
+        def parts():
+            yield '012'
+            yield '34'
+        buf = CharOrientedBuffer()
+        buf.bind(parts())
+        self.assertEqual(buf._do_extend_by_iter(10), 5)
+        self.assertEqual(buf[:], '01234')
+        for i in range(2):
+            self.assertEqual(buf._do_extend_by_iter(10), 0)
+            self.assertEqual(buf[:], '01234')
+            self.assertEqual(buf._fsm_str, '01234')
 #############################################################################
 
 #############################################################################
@@ -823,6 +1026,49 @@ class Test_CharOrientedBuffer__update_end_marker(TestCase):
                 self.assertEqual(buf._end_char_no, markers[5])
 #############################################################################
 
+#############################################################################
+# Test: CharOrientedBuffer: _fsm_identity
+#############################################################################
+@patch.object(CharOrientedBuffer, '_fsm_identity', True)
+@patch.object(CharOrientedBuffer, '_make_fsm_str')
+class Test_CharOrientedBuffer__fsm_identity(TestCase):
+
+    def test_fsm_identity_assign(self, _make_fsm_str):
+        "CharOrientedBuffer: with _fsm_identity, buf.assign(...) sets " \
+        "fsm_str() to content without calling _make_fsm_str()"
+        buf = CharOrientedBuffer()
+        buf.assign(0, 0, 0, 'ab\ncd')
+        self.assertEqual(buf.fsm_str(), 'ab\ncd')
+        buf.assign(0, 0, 0, None)
+        self.assertEqual(buf.fsm_str(), '')
+        self.assertFalse(_make_fsm_str.called)
+
+    def test_fsm_identity_extend(self, _make_fsm_str):
+        "CharOrientedBuffer: with _fsm_identity, buf.extend(...) keeps " \
+        "fsm_str() equal to content without calling _make_fsm_str()"
+        _input = 'ab\ncd\nefg'
+        for make_input in [ lambda : _input,
+                            lambda : iter(_input.splitlines(True)) ]:
+            buf = CharOrientedBuffer(make_input())
+            while buf.extend(3):
+                self.assertEqual(buf.fsm_str(), str(buf))
+            self.assertEqual(buf.fsm_str(), _input)
+        self.assertFalse(_make_fsm_str.called)
+
+    def test_fsm_identity_shift(self, _make_fsm_str):
+        "CharOrientedBuffer: with _fsm_identity, buf.shift(n) keeps " \
+        "fsm_str() equal to content of buf and of the shifted-out buffer " \
+        "without calling _make_fsm_str()"
+        buf = CharOrientedBuffer(None, 0, 0, 0, 'ab\ncd\nefg')
+        head = buf.shift(4)
+        self.assertEqual(head.fsm_str(), 'ab\nc')
+        self.assertEqual(buf.fsm_str(), 'd\nefg')
+        head = buf.shift(5)
+        self.assertEqual(head.fsm_str(), 'd\nefg')
+        self.assertEqual(buf.fsm_str(), '')
+        self.assertFalse(_make_fsm_str.called)
+#############################################################################
+
 
 #############################################################################
 #
@@ -1053,6 +1299,34 @@ class Test_LineOrientedTokenizer__on_bind(TestCase):
         rv = buf._on_bind(iterable)
         self.assertEqual(tuple(rv), tuple(iter(iterable)))
         self.assertEqual(buf._do_extend, buf._do_extend_by_iter)
+    def test__onbind_caches_read_methods(self, *args):
+        "LineOrientedBuffer: buf._on_bind(readable) caches readable.read " \
+        "and readable.readline for buf._do_extend_by_read()"
+        class Readable(object):
+            def read(self): pass
+            def readline(self): pass
+        buf = LineOrientedBuffer()
+        readable = Readable()
+        buf._on_bind(readable)
+        self.assertEqual(buf._input_read, readable.read)
+        self.assertEqual(buf._input_readline, readable.readline)
+    def test__onbind_not_readable(self, *args):
+        "LineOrientedBuffer: buf._on_bind(obj) sets " \
+        "buf._do_extend = buf._do_extend_by_iter, if obj.read or " \
+        "obj.readline is missing or not callable"
+        class ReadOnly(object):
+            def read(self): pass
+            def __iter__(self): return iter(['abc'])
+        class NotCallable(object):
+            read = 'abc'
+            readline = 'abc'
+            def __iter__(self): return iter(['abc'])
+        for obj in [ReadOnly(), NotCallable()]:
+            buf = LineOrientedBuffer()
+            rv = buf._on_bind(obj)
+            self.assertEqual(tuple(rv), ('abc',))
+            self.assertEqual(buf._do_extend, buf._do_extend_by_iter)
+            self.assertFalse(hasattr(buf, '_input_read'))
 #############################################################################
         
 #############################################################################
@@ -1109,6 +1383,68 @@ class Test_LineOrientedBuffer__do_assign(TestCase):
         self.assertEqual(buf._content,[])
 #############################################################################
 
+#############################################################################
+# Test: LineOrientedBuffer: _do_append_lines()
+#############################################################################
+def _line_fsm_str(lines):
+    # 'L' for complete lines, 'I' for incomplete ones
+    return ''.join([ (l[-1:] == '\n') and 'L' or 'I' for l in lines ])
+
+@patch.object(LineOrientedBuffer, '_make_fsm_str', side_effect = _line_fsm_str)
+class Test_LineOrientedBuffer__do_append_lines(TestCase):
+
+    def test__doappendlines_joins_incomplete_line(self, _make_fsm_str):
+        "LineOrientedBuffer: buf._do_append_lines(lines) joins lines[0] to " \
+        "an incomplete last line of buf and replaces its FSM character"
+        buf = LineOrientedBuffer(None, 0, 0, 0, ['ab\n', 'cd'])
+        self.assertEqual(buf.fsm_str(), 'LI')
+        with patch.object(LineOrientedBuffer, '_make_fsm_str',
+                          side_effect = _line_fsm_str) as method:
+            buf._do_append_lines(['ef\n', 'gh'])
+            method.assert_called_once_with(['cdef\n', 'gh'])
+        self.assertEqual(buf._content, ['ab\n', 'cdef\n', 'gh'])
+        self.assertEqual(buf.fsm_str(), 'LLI')
+        buf._do_append_lines(['ij'])
+        self.assertEqual(buf._content, ['ab\n', 'cdef\n', 'ghij'])
+        self.assertEqual(buf.fsm_str(), 'LLI')
+
+    def test__doappendlines_appends_after_complete_line(self, _make_fsm_str):
+        "LineOrientedBuffer: buf._do_append_lines(lines) appends lines " \
+        "after a complete last line of buf"
+        buf = LineOrientedBuffer(None, 0, 0, 0, ['ab\n'])
+        buf._do_append_lines(['cd\n', 'e'])
+        self.assertEqual(buf._content, ['ab\n', 'cd\n', 'e'])
+        self.assertEqual(buf.fsm_str(), 'LLI')
+        buf = LineOrientedBuffer()
+        buf._do_append_lines(['cd'])
+        self.assertEqual(buf._content, ['cd'])
+        self.assertEqual(buf.fsm_str(), 'I')
+
+    def test__doappendlines_empty(self, _make_fsm_str):
+        "LineOrientedBuffer: buf._do_append_lines([]) does nothing"
+        buf = LineOrientedBuffer(None, 0, 0, 0, ['ab'])
+        with patch.object(LineOrientedBuffer, '_make_fsm_str') as method:
+            buf._do_append_lines([])
+            self.assertFalse(method.called)
+        self.assertEqual(buf._content, ['ab'])
+        self.assertEqual(buf.fsm_str(), 'I')
+        self.assertEqual(buf._nchars, 2)
+
+    def test__doappendlines_updates_nchars(self, _make_fsm_str):
+        "LineOrientedBuffer: buf._do_append_lines(lines) keeps buf._nchars " \
+        "equal to the number of characters in buf"
+        buf = LineOrientedBuffer(None, 1, 2, 3, ['ab\n', 'c'])
+        self.assertEqual(buf._nchars, 4)
+        for lines in [['d\n'], ['ef', ], ['g\n', '\n', 'hij'], []]:
+            buf._do_append_lines(lines)
+            self.assertEqual(buf._nchars, len(str(buf)))
+            buf._update_end_marker()
+            self.assertEqual(buf.end_char_no(), 3 + len(str(buf)))
+        head = buf.shift(2)
+        self.assertEqual(head._nchars, len(str(head)))
+        self.assertEqual(buf._nchars, len(str(buf)))
+#############################################################################
+
 #############################################################################
 # Test: LineOrientedBuffer: _do_extend_by_string()
 #############################################################################
@@ -1126,18 +1462,51 @@ class Test_LineOrientedBuffer__do_extend_by_string(TestCase):
         self.assertEqual(''.join(buf[:]), _input[:10])
         self.assertEqual(buf._do_extend_by_string(6), 2) # tail
         self.assertEqual(''.join(buf[:]), _input[:])
+
+    @patch.object(LineOrientedBuffer,'_make_fsm_str')
+    def test__doextendbystring_completes_last_line(self,*args):
+        "LineOrientedBuffer: buf._do_extend_by_string(n) extends the chunk " \
+        "up to the end of its last line, or to the end of input"
+        _input = 'ab\ncdef\ngh'
+        for size, lines in [ (1, ['ab\n']),
+                             (3, ['ab\n']),
+                             (4, ['ab\n', 'cdef\n']),
+                             (8, ['ab\n', 'cdef\n']),
+                             (9, ['ab\n', 'cdef\n', 'gh']),
+                             (100, ['ab\n', 'cdef\n', 'gh']) ]:
+            buf = LineOrientedBuffer()
+            buf.bind(_input)
+            self.assertEqual(buf._do_extend_by_string(size),
+                             len(''.join(lines)), size)
+            self.assertEqual(buf[:], lines, size)
+        buf = LineOrientedBuffer()
+        buf.bind('abc')
+        self.assertEqual(buf._do_extend_by_string(1), 3) # no newline at all
+        self.assertEqual(buf[:], ['abc'])
+        self.assertEqual(buf._do_extend_by_string(1), 0) # end of input
+        self.assertEqual(buf[:], ['abc'])
 #############################################################################
 
-###############################################################################
-### Test: LineOrientedBuffer: _do_extend_by_read()
-###############################################################################
-##class Test_LineOrientedBuffer__do_extend_by_read(TestCase):
-##    def test__doextendbyread_1(self):
-##        "LineOrientedBuffer: buf._do_extend_by_read() works for some " \
-##        "simple test fixtures"
-##        buf = LineOrientedBuffer()
-##        # TODO: write this test
-###############################################################################
+#############################################################################
+# Test: LineOrientedBuffer: _do_extend_by_read()
+#############################################################################
+class Test_LineOrientedBuffer__do_extend_by_read(TestCase):
+    @patch.object(LineOrientedBuffer,'_make_fsm_str')
+    def test__doextendbyread_1(self,*args):
+        "LineOrientedBuffer: buf._do_extend_by_read() works for some " \
+        "simple test fixtures"
+        _input = '012\n45678\n01'
+        buf = LineOrientedBuffer()
+        buf.bind(StringIO(_input))
+        self.assertEqual(buf._do_extend_by_read(3), 4) # '012' + '\n'
+        self.assertEqual(''.join(buf[:]), _input[:4])
+        self.assertEqual(buf._do_extend_by_read(6), 6) # full chunk
+        self.assertEqual(''.join(buf[:]), _input[:10])
+        self.assertEqual(buf._do_extend_by_read(6), 2) # tail
+        self.assertEqual(''.join(buf[:]), _input[:])
+        self.assertEqual(buf._do_extend_by_read(6), 0) # end of input
+        self.assertEqual(buf[:], ['012\n', '45678\n', '01'])
+#############################################################################
 
 #############################################################################
 # Test: LineOrientedBuffer: _do_extend_by_iter()
@@ -1156,6 +1525,22 @@ class Test_LineOrientedBuffer__do_extend_by_iter(TestCase):
         self.assertEqual(''.join(buf[:]), ''.join(_input)[:10])
         self.assertEqual(buf._do_extend_by_iter(6), 2) # tail
         self.assertEqual(''.join(buf[:]), ''.join(_input)[:])
+
+    @patch.object(LineOrientedBuffer,'_make_fsm_str')
+    def test__doextendbyiter_end_of_input(self,*args):
+        "LineOrientedBuffer: buf._do_extend_by_iter() returns 0 and leaves " \
+        "buf unchanged at the end of iterator input"
+        def lines():
+            yield '012'
+            yield '3\n'
+            yield '45'
+        buf = LineOrientedBuffer()
+        buf.bind(lines())
+        self.assertEqual(buf._do_extend_by_iter(10), 7)
+        self.assertEqual(buf[:], ['0123\n', '45'])
+        for i in range(2):
+            self.assertEqual(buf._do_extend_by_iter(10), 0)
+            self.assertEqual(buf[:], ['0123\n', '45'])
 #############################################################################
 
 #############################################################################
@@ -1282,6 +1667,7 @@ if __name__ == "__main__":
         Test_CharOrientedBuffer_assign,
         Test_CharOrientedBuffer_extend,
         Test_CharOrientedBuffer_shift,
+        Test_CharOrientedBuffer_shift_chunks,
         Test_CharOrientedBuffer_bookmarking,
         Test_CharOrientedTokenizer_fsm_str,
         Test_CharOrientedBuffer___str__,
@@ -1295,6 +1681,8 @@ if __name__ == "__main__":
         Test_CharOrientedBuffer__do_extend_by_read,
         Test_CharOrientedBuffer__do_extend_by_iter,
         Test_CharOrientedBuffer__update_end_marker,
+        Test_CharOrientedBuffer__fsm_identity,
+        Test_CharOrientedBuffer__split,
         Test_LineOrientedBuffer___init__,
         Test_LineOrientedBuffer_bind,
         Test_LineOrientedBuffer_set_start_marker,
@@ -1311,7 +1699,9 @@ if __name__ == "__main__":
         Test_LineOrientedBuffer___iter__,
         Test_LineOrientedTokenizer__on_bind,
         Test_LineOrientedBuffer__do_assign,
+        Test_LineOrientedBuffer__do_append_lines,
         Test_LineOrientedBuffer__do_extend_by_string,
+        Test_LineOrientedBuffer__do_extend_by_read,
         Test_LineOrientedBuffer__do_extend_by_iter,
         Test_LineOrientedBuffer__update_end_marker,
         Test_LineOrientedTokenizer__make_fsm_str,
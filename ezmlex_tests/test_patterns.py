@@ -0,0 +1,212 @@
+# coding: utf-8
+""" ezmlex_tests.test_patterns
+
+Unit tests for ezmlex.patterns module
+"""
+
+
+#
+# Copyright (c) 2012 by Pawel Tomulik
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE
+
+__docformat__ = "restructuredText"
+
+
+import re
+from unittest import TestCase
+from mock import patch
+from ezmlex import patterns
+from ezmlex.patterns import first_chars, def_pattern, fuse, fuse_patterns, \
+                            find_fused_patterns, find_matching_patterns, \
+                            recompile
+
+#############################################################################
+# Test: _compile()
+#############################################################################
+class Test__compile(TestCase):
+
+    def test__compile_caches(self):
+        "recompile(regex) returns same object for equal patterns"
+        self.assertIs(recompile('a+b'), recompile(re.compile('a+b')))
+        self.assertIsNot(recompile('a+b'), recompile('a+b', re.I))
+
+    def test__compile_cache_is_bounded(self):
+        "_compile() clears its cache when it exceeds _MAXCACHE entries"
+        with patch.object(patterns, '_MAXCACHE', 10):
+            with patch.object(patterns, '_compiled', {}):
+                for i in range(25):
+                    recompile('x{%d}' % i)
+                    self.assertTrue(len(patterns._compiled) <= 10)
+
+    def test__compile_cache_is_bounded_by_maxcache(self):
+        "_compile() keeps at most _MAXCACHE entries in its cache"
+        with patch.object(patterns, '_compiled', {}):
+            for i in range(patterns._MAXCACHE + 50):
+                recompile('y{%d}' % i)
+                self.assertTrue(len(patterns._compiled) <= patterns._MAXCACHE)
+            self.assertTrue(len(patterns._compiled) > 0)
+            # the most recent pattern is still cached
+            self.assertIs(recompile('y{%d}' % i), recompile('y{%d}' % i))
+
+    def test__compile_set_engine(self):
+        "_compile() doesn't return expressions compiled by other engine " \
+        "than the one selected with set_engine()"
+        class Engine(object):
+            def compile(self, regex, *args):
+                return ('compiled', regex) + args
+        with patch.object(patterns, '_compiled', {}):
+            compiled = recompile('a+b')
+            try:
+                patterns.set_engine(Engine())
+                self.assertEqual(recompile('a+b'), ('compiled', 'a+b'))
+                self.assertEqual(recompile('a+b', re.I),
+                                 ('compiled', 'a+b', re.I))
+            finally:
+                patterns.set_engine(None)
+            self.assertIs(recompile('a+b'), compiled)
+            self.assertEqual(recompile('a+b').match('aab').group(), 'aab')
+#############################################################################
+
+#############################################################################
+# Test: first_chars()
+#############################################################################
+class Test_first_chars(TestCase):
+
+    def test_first_chars_literals(self):
+        "first_chars(regex) returns set of leading characters of regex"
+        self.assertEqual(first_chars('abc'), frozenset('a'))
+        self.assertEqual(first_chars('[a-c]x'), frozenset('abc'))
+        self.assertEqual(first_chars('ab|cd|e'), frozenset('ace'))
+        self.assertEqual(first_chars('(?:ab)+c'), frozenset('a'))
+        self.assertEqual(first_chars('x{2,}'), frozenset('x'))
+        self.assertEqual(first_chars(re.compile('[_a]b')), frozenset('_a'))
+
+    def test_first_chars_empty_match(self):
+        "first_chars(regex) returns None if regex may match empty string"
+        for regex in ['', 'a*', 'a?b', 'a{0,3}', 'a|', '(?:a|b*)c']:
+            self.assertIsNone(first_chars(regex), regex)
+
+    def test_first_chars_anchors(self):
+        "first_chars(regex) returns None if regex starts with an anchor"
+        for regex in ['^a', '$', r'\Aa', r'\ba']:
+            self.assertIsNone(first_chars(regex), regex)
+
+    def test_first_chars_ignorecase(self):
+        "first_chars(regex) returns None for case-insensitive regex"
+        self.assertIsNone(first_chars('(?i)a'))
+        self.assertIsNone(first_chars(re.compile('a', re.IGNORECASE)))
+
+    def test_first_chars_categories(self):
+        "first_chars(regex) returns None if regex starts with a category"
+        for regex in [r'\w+', r'\s', r'\d', r'[\w.]', '.', r'\S+']:
+            self.assertIsNone(first_chars(regex), regex)
+
+    def test_first_chars_negated_classes(self):
+        "first_chars(regex) returns None if regex starts with negated class"
+        for regex in ['[^a]', '[^a-z]+', '[^#]x']:
+            self.assertIsNone(first_chars(regex), regex)
+
+    def test_first_chars_non_ascii(self):
+        "first_chars(regex) returns None for non-ASCII leading characters"
+        self.assertIsNone(first_chars(u'ą'))
+        self.assertIsNone(first_chars(u'[aą]'))
+
+    def test_first_chars_other_engine(self):
+        "first_chars(regex) returns None if engine other than re is selected"
+        with patch.object(patterns, '_engine', object()):
+            self.assertIsNone(first_chars(re.compile('abc')))
+
+    def test_first_chars_unparsable(self):
+        "first_chars(regex) returns None if sre_parse can't parse regex"
+        class Pattern(object):
+            pattern = 'a++'
+            flags = 0
+        self.assertIsNone(first_chars(Pattern()))
+#############################################################################
+
+#############################################################################
+# Test: fuse(), fuse_patterns() and find_fused_patterns()
+#############################################################################
+class Test_fuse_patterns(TestCase):
+
+    def test_fuse_groups(self):
+        "fuse(patterns) captures n-th pattern's match in (n+1)-th group"
+        regex = fuse([re.compile('a+'), re.compile('ab'), re.compile('b')])
+        m = regex.match('aab')
+        self.assertEqual(m.groups(), ('aa', None, None))
+        m = regex.match('ab')
+        self.assertEqual(m.groups(), ('a', 'ab', None))
+        m = regex.match('b')
+        self.assertEqual(m.groups(), (None, None, 'b'))
+
+    def test_fuse_unfusable(self):
+        "fuse(patterns) returns None for patterns with groups or " \
+        "different flags"
+        self.assertIsNone(fuse([re.compile('a'), re.compile('(b)')]))
+        self.assertIsNone(fuse([re.compile('a'), re.compile('b', re.I)]))
+        self.assertIsNotNone(fuse([re.compile('a', re.I),
+                                   re.compile('b', re.I)]))
+
+    def test_find_fused_patterns(self):
+        "find_fused_patterns(fuse_patterns(tab), s) finds same patterns as " \
+        "find_matching_patterns(tab, s)"
+        tab = {}
+        def_pattern(tab, 'A', '^a+$')
+        def_pattern(tab, 'B', '^b')
+        def_pattern(tab, 'W', r'^\w+$')
+        def_pattern(tab, 'E', '^$')
+        fused = fuse_patterns(tab)
+        self.assertIsNotNone(fused)
+        for string in ['a', 'aa', 'ab', 'b', 'bc', '', '#', 'a#']:
+            self.assertEqual(sorted(find_fused_patterns(fused, string)),
+                             sorted(find_matching_patterns(tab, string)),
+                             string)
+
+    def test_fuse_patterns_unfusable(self):
+        "fuse_patterns(tab) returns None if patterns can't be fused"
+        tab = {}
+        def_pattern(tab, 'A', 'a')
+        def_pattern(tab, 'G', '(b)c')
+        self.assertIsNone(fuse_patterns(tab))
+#############################################################################
+
+if __name__ == "__main__":
+    import sys
+    import unittest
+    ldr = unittest.TestLoader()
+    suite = unittest.TestSuite()
+    # Load tests to test suite
+    tclasses = [
+        Test__compile,
+        Test_first_chars,
+        Test_fuse_patterns,
+    ]
+
+    for tclass in tclasses:
+        suite.addTests(ldr.loadTestsFromTestCase(tclass))
+
+    if not unittest.TextTestRunner(verbosity = 2).run(suite).wasSuccessful():
+        sys.exit(1)
+
+# Local Variables:
+# # tab-width:4
+# # indent-tabs-mode:nil
+# # End:
+# vim: set syntax=python expandtab tabstop=4 shiftwidth=4:
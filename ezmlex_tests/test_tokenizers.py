@@ -0,0 +1,470 @@
+# coding: utf-8
+""" ezmlex_tests.test_tokenizers
+
+Unit tests for ezmlex.tokenizers module
+"""
+
+
+#
+# Copyright (c) 2012 by Pawel Tomulik
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE
+
+__docformat__ = "restructuredText"
+
+
+import re
+from unittest import TestCase
+from ezmlex.tokenizers import TokenizerBase
+from ezmlex.tokens import find_matching_tokens
+from ezmlex.buffers import CharOrientedBuffer
+
+#############################################################################
+# Test: TokenizerBase: _find_token_types()
+#############################################################################
+class Test_TokenizerBase__find_token_types(TestCase):
+
+    def _make_tokenizer(self):
+        class Tokenizer(TokenizerBase): pass
+        Tokenizer.def_token_type('Id', r'[a-z_][a-z0-9_]*')
+        Tokenizer.def_token_type('Kw', r'if|else|elif')
+        Tokenizer.def_token_type('Num', r'[0-9]+')
+        Tokenizer.def_token_type('Float', r'[0-9]+\.[0-9]*')
+        Tokenizer.def_token_type('Space', r'\s+')
+        Tokenizer.def_token_type('Op', r'[-+*/=]=?')
+        Tokenizer.def_token_type('Any', r'[^a-z]')
+        Tokenizer.def_token_type('Opt', r'x?y')
+        return Tokenizer
+
+    def _matching_tokens(self, tokenizer, *args):
+        return sorted([ (_id, Token, m.end() - m.start()) \
+                        for _id, Token, m \
+                        in find_matching_tokens(tokenizer.token_types(),
+                                                *args) ])
+
+    def test_find_token_types_equals_find_matching_tokens(self):
+        "TokenizerBase: _find_token_types(s, pos) finds same tokens as " \
+        "find_matching_tokens(token_types(), s, pos)"
+        Tokenizer = self._make_tokenizer()
+        string = 'if x1 else xy y elif 12.5e = 3 += _a\t\n?'
+        for pos in range(len(string) + 1):
+            self.assertEqual(
+                sorted(Tokenizer._find_token_types(string, pos)),
+                self._matching_tokens(Tokenizer, string, pos),
+                (string, pos))
+
+    def test_match_token_types(self):
+        "TokenizerBase: match_token_types(s, pos) returns match objects of " \
+        "the token types found by _find_token_types(s, pos)"
+        Tokenizer = self._make_tokenizer()
+        string = 'if x1 else 12.5e = 3'
+        for pos in range(len(string) + 1):
+            self.assertEqual(
+                sorted([ (_id, Token, m.span()) for _id, Token, m \
+                         in Tokenizer.match_token_types(string, pos) ]),
+                sorted([ (_id, Token, (pos, pos + length)) \
+                         for _id, Token, length \
+                         in Tokenizer._find_token_types(string, pos) ]),
+                (string, pos))
+
+    def test_token_uses_match_token_types(self):
+        "TokenizerBase: token() finds token types with match_token_types()"
+        class Buffer(CharOrientedBuffer):
+            _fsm_identity = True
+        class Tokenizer(TokenizerBase):
+            def _init_buffer(self, *args, **kw):
+                self._buffer = Buffer(*args, **kw)
+            @classmethod
+            def match_token_types(cls, *args):
+                # keywords take precedence over identifiers
+                match_list = super(Tokenizer, cls).match_token_types(*args)
+                return [ x for x in match_list if x[0] == 'Kw' ] \
+                    or match_list
+        Tokenizer.def_token_type('Id', r'[a-z]+')
+        Tokenizer.def_token_type('Kw', r'if|else')
+        Tokenizer.def_token_type('Space', r' +')
+        tokens = Tokenizer('if x else').tokens()
+        self.assertEqual([(t.id(), t.value()) for t in tokens],
+                         [('Kw', 'if'), ('Space', ' '), ('Id', 'x'),
+                          ('Space', ' '), ('Kw', 'else')])
+
+    def test_find_token_types_after_def_token_type(self):
+        "TokenizerBase: _find_token_types() takes token types defined " \
+        "after its first call into account"
+        Tokenizer = self._make_tokenizer()
+        self.assertEqual(Tokenizer._find_token_types('@'),
+                         [('Any', Tokenizer.token_type('Any'), 1)])
+        Tokenizer.def_token_type('At', r'@+')
+        self.assertEqual(sorted(Tokenizer._find_token_types('@@')),
+                         [('Any', Tokenizer.token_type('Any'), 1),
+                          ('At', Tokenizer.token_type('At'), 2)])
+
+    def test_find_token_types_unknown_chars(self):
+        "TokenizerBase: _find_token_types() caches single fused expression " \
+        "for all characters not starting any token type with known first " \
+        "characters"
+        class Tokenizer(TokenizerBase): pass
+        Tokenizer.def_token_type('Id', r'[a-z]+')
+        Tokenizer.def_token_type('Num', r'[0-9]+')
+        Tokenizer.def_token_type('Any', r'[^a-z0-9]')
+        Any = Tokenizer.token_type('Any')
+        string = u''.join([ unichr(i) for i in range(0x100, 0x1100) ])
+        for pos in range(len(string)):
+            self.assertEqual(Tokenizer._find_token_types(string, pos),
+                             [('Any', Any, 1)])
+        self.assertEqual(Tokenizer._find_token_types(u'ab1'),
+                         [('Id', Tokenizer.token_type('Id'), 2)])
+        self.assertEqual(Tokenizer._find_token_types(u'ab1', 2),
+                         [('Num', Tokenizer.token_type('Num'), 1)])
+        fused_by_char = Tokenizer._fused_token_types[2]
+        self.assertEqual(sorted(fused_by_char.keys()), [None, u'1', u'a'])
+#############################################################################
+
+#############################################################################
+# Test: TokenizerBase: fsm_char()
+#############################################################################
+class Test_TokenizerBase_fsm_char(TestCase):
+
+    def _make_tokenizer(self):
+        class Tokenizer(TokenizerBase): pass
+        Tokenizer.def_fsm_char_pattern(' ', r'[\t ]*\n?')
+        Tokenizer.def_fsm_char_pattern('#', r'#.*\n?')
+        Tokenizer.def_fsm_char_pattern('L', r'[^#\s].*\n?')
+        return Tokenizer
+
+    def test_fsm_char(self):
+        "TokenizerBase: fsm_char(item) returns the FSM character of the " \
+        "pattern matching item, or '\\0' if no pattern matches"
+        Tokenizer = self._make_tokenizer()
+        for item, ch in [('\n', ' '), ('  \n', ' '), ('# x\n', '#'),
+                         ('x #\n', 'L'), ('x', 'L'), ('x\ny', '\0')]:
+            self.assertEqual(Tokenizer.fsm_char(item), ch, item)
+
+    def test_fsm_char_not_mutually_exclusive(self):
+        "TokenizerBase: fsm_char(item) raises RuntimeError if more than " \
+        "one FSM character pattern matches item"
+        Tokenizer = self._make_tokenizer()
+        Tokenizer.def_fsm_char_pattern('X', r'x.*\n?')
+        self.assertEqual(Tokenizer.fsm_char('y\n'), 'L')
+        with self.assertRaises(RuntimeError):
+            Tokenizer.fsm_char('x\n')
+
+    def test_fsm_char_after_def_fsm_char_pattern(self):
+        "TokenizerBase: fused FSM character patterns and cached FSM " \
+        "characters are rebuilt after def_fsm_char_pattern()"
+        Tokenizer = self._make_tokenizer()
+        tab, fused, cache = Tokenizer._fsm_char_state()
+        self.assertIsNotNone(fused)
+        self.assertIs(Tokenizer._fsm_char_state()[1], fused)
+        self.assertEqual(Tokenizer._make_fsm_str_by_patterns(['\x0c\n']),
+                         '\0')
+        self.assertEqual(cache, {'\x0c\n' : '\0'})
+        Tokenizer.def_fsm_char_pattern('F', r'\x0c\n?')
+        tab2, fused2, cache2 = Tokenizer._fsm_char_state()
+        self.assertIs(tab2, tab)
+        self.assertIsNot(fused2, fused)
+        self.assertEqual(cache2, {})
+        self.assertEqual(Tokenizer._make_fsm_str_by_patterns(['\x0c\n']),
+                         'F')
+        Tokenizer.del_fsm_char_pattern('F')
+        self.assertEqual(Tokenizer._make_fsm_str_by_patterns(['\x0c\n']),
+                         '\0')
+
+    def test_many_fsm_char_patterns(self):
+        "TokenizerBase: fsm_char() works with more FSM character patterns " \
+        "than python's re can fuse into one expression"
+        class Tokenizer(TokenizerBase): pass
+        chars = [ chr(i) for i in range(0x21, 0x21 + 120) ]
+        for ch in chars:
+            Tokenizer.def_fsm_char_pattern(ch, r'%s+\n?' % re.escape(ch))
+        self.assertIsNone(Tokenizer._fsm_char_state()[1])
+        items = [ ch * 2 + '\n' for ch in chars ] + ['  \n']
+        self.assertEqual(Tokenizer._make_fsm_str_by_patterns(items),
+                         ''.join(chars) + '\0')
+#############################################################################
+
+#############################################################################
+# Test: TokenizerBase: _error_token()
+#############################################################################
+class Test_TokenizerBase__error_token(TestCase):
+
+    def _make_tokenizer(self):
+        class Buffer(CharOrientedBuffer):
+            _fsm_identity = True
+        class Tokenizer(TokenizerBase):
+            def _init_buffer(self, *args, **kw):
+                self._buffer = Buffer(*args, **kw)
+        Tokenizer.def_token_type('Space', r' +')
+        return Tokenizer
+
+    def test_error_token(self):
+        "TokenizerBase: _error_token() returns error token of the error " \
+        "type matching input"
+        Tokenizer = self._make_tokenizer()
+        Tokenizer.def_error_type('Error', r'[^ ]+', 'error')
+        tokens = Tokenizer('ab c').tokens()
+        self.assertEqual([(t.id(), t.value()) for t in tokens],
+                         [('Error', 'ab'), ('Space', ' '), ('Error', 'c')])
+        self.assertTrue(tokens[0].is_error())
+
+    def test_error_token_not_mutually_exclusive(self):
+        "TokenizerBase: _error_token() raises RuntimeError if more than " \
+        "one error type matches input"
+        Tokenizer = self._make_tokenizer()
+        Tokenizer.def_error_type('Error1', r'a', 'error')
+        Tokenizer.def_error_type('Error2', r'a+', 'error')
+        with self.assertRaises(RuntimeError):
+            Tokenizer('aa').token()
+
+    def test_error_token_no_error_type(self):
+        "TokenizerBase: _error_token() raises RuntimeError if no error " \
+        "type matches input"
+        Tokenizer = self._make_tokenizer()
+        Tokenizer.def_error_type('Error', r'a', 'error')
+        with self.assertRaises(RuntimeError):
+            Tokenizer('b').token()
+
+    def test_error_token_uses_match_error_types(self):
+        "TokenizerBase: _error_token() finds error types with " \
+        "match_error_types()"
+        Tokenizer = self._make_tokenizer()
+        Tokenizer.def_error_type('Error', r'.', 'error')
+        Tokenizer.def_error_type('Error2', r'..', 'error')
+        class Tokenizer2(Tokenizer):
+            @classmethod
+            def match_error_types(cls, *args):
+                # prefer Error2 over Error
+                match_list = super(Tokenizer2, cls).match_error_types(*args)
+                return [ x for x in match_list if x[0] == 'Error2' ] \
+                    or match_list
+        tokens = Tokenizer2('abc').tokens()
+        self.assertEqual([(t.id(), t.value()) for t in tokens],
+                         [('Error2', 'ab'), ('Error', 'c')])
+
+    def test_many_error_types(self):
+        "TokenizerBase: _error_token() works with more error types than " \
+        "can be fused into one expression"
+        Tokenizer = self._make_tokenizer()
+        for i in range(120):
+            Tokenizer.def_error_type('E%d' % i, r'e%d(?![0-9])' % i, 'error')
+        Tokenizer.def_error_type('Error', r'[^e ]', 'error')
+        tokens = Tokenizer('e7 e119 x').tokens()
+        self.assertEqual([(t.id(), t.value()) for t in tokens],
+                         [('E7', 'e7'), ('Space', ' '),
+                          ('E119', 'e119'), ('Space', ' '),
+                          ('Error', 'x')])
+#############################################################################
+
+#############################################################################
+# Test: TokenizerBase: token()
+#############################################################################
+class Test_TokenizerBase_token(TestCase):
+
+    def _make_tokenizer(self, chunk = 1):
+        class Buffer(CharOrientedBuffer):
+            _fsm_identity = True
+            _default_chunk = chunk
+        class Tokenizer(TokenizerBase):
+            def _init_buffer(self, *args, **kw):
+                self._buffer = Buffer(*args, **kw)
+        Tokenizer.def_token_type('A', r'a')
+        Tokenizer.def_token_type('AA', r'aa')
+        Tokenizer.def_token_type('AB', r'ab')
+        Tokenizer.def_token_type('AX', r'a[bx]')
+        Tokenizer.def_token_type('Space', r' +')
+        Tokenizer.def_error_type('Error', r'.', 'error')
+        return Tokenizer
+
+    def _tokens(self, Tokenizer, string):
+        return [ (t.id(), t.value()) for t in Tokenizer(string).tokens() ]
+
+    def test_token_longest(self):
+        "TokenizerBase: token() returns the longest of matching tokens"
+        for chunk in [1, 2, 32]:
+            Tokenizer = self._make_tokenizer(chunk)
+            self.assertEqual(self._tokens(Tokenizer, 'aaa a ax'),
+                             [('AA', 'aa'), ('A', 'a'), ('Space', ' '),
+                              ('A', 'a'), ('Space', ' '), ('AX', 'ax')],
+                             chunk)
+
+    def test_token_whole_buffer(self):
+        "TokenizerBase: token() reads more input while some token matches " \
+        "whole buffer"
+        Tokenizer = self._make_tokenizer(1)
+        tokenizer = Tokenizer('aa')
+        token = tokenizer.token()
+        self.assertEqual((token.id(), token.value()), ('AA', 'aa'))
+        self.assertIsNone(tokenizer.token())
+
+    def test_token_ambiguous(self):
+        "TokenizerBase: token() returns error token if more than one " \
+        "token has the longest match"
+        for chunk in [1, 2, 32]:
+            Tokenizer = self._make_tokenizer(chunk)
+            self.assertEqual(self._tokens(Tokenizer, 'ab a'),
+                             [('Error', 'a'), ('Error', 'b'), ('Space', ' '),
+                              ('A', 'a')], chunk)
+
+    def test_token_no_match(self):
+        "TokenizerBase: token() returns error token if no token matches"
+        Tokenizer = self._make_tokenizer()
+        self.assertEqual(self._tokens(Tokenizer, 'b a'),
+                         [('Error', 'b'), ('Space', ' '), ('A', 'a')])
+#############################################################################
+
+#############################################################################
+# Test: TokenizerBase: tokens() and __iter__()
+#############################################################################
+class Test_TokenizerBase_tokens(TestCase):
+
+    def _make_tokenizer(self):
+        class Buffer(CharOrientedBuffer):
+            _fsm_identity = True
+        class Tokenizer(TokenizerBase):
+            def _init_buffer(self, *args, **kw):
+                self._buffer = Buffer(*args, **kw)
+        Tokenizer.def_token_type('Word', r'[a-z]+')
+        Tokenizer.def_token_type('Space', r'\s+')
+        Tokenizer.def_error_type('Error', r'.', 'error')
+        return Tokenizer
+
+    def _expected(self, Tokenizer, string):
+        tokenizer = Tokenizer(string)
+        tokens = []
+        token = tokenizer.token()
+        while token is not None:
+            tokens.append(token)
+            token = tokenizer.token()
+        return self._ids_and_values(tokens)
+
+    def _ids_and_values(self, tokens):
+        return [ (t.id(), t.line_no(), t.col_no(), t.char_no(), t.value()) \
+                 for t in tokens ]
+
+    def test_tokens(self):
+        "TokenizerBase: tokens() returns list of all tokens returned by " \
+        "subsequent calls to token()"
+        Tokenizer = self._make_tokenizer()
+        string = 'foo bar\n ?baz\n'
+        tokens = Tokenizer(string).tokens()
+        self.assertIsInstance(tokens, list)
+        self.assertEqual(self._ids_and_values(tokens),
+                         self._expected(Tokenizer, string))
+        self.assertEqual([ t.value() for t in tokens ],
+                         ['foo', ' ', 'bar', '\n ', '?', 'baz', '\n'])
+
+    def test_tokens_remaining(self):
+        "TokenizerBase: tokens() returns only tokens not yet read, and " \
+        "[] at the end of input"
+        Tokenizer = self._make_tokenizer()
+        tokenizer = Tokenizer('foo bar')
+        self.assertEqual(tokenizer.token().value(), 'foo')
+        self.assertEqual([ t.value() for t in tokenizer.tokens() ],
+                         [' ', 'bar'])
+        self.assertEqual(tokenizer.tokens(), [])
+        self.assertEqual(Tokenizer('').tokens(), [])
+
+    def test_iter(self):
+        "TokenizerBase: iter(tokenizer) yields same tokens as subsequent " \
+        "calls to token()"
+        Tokenizer = self._make_tokenizer()
+        string = 'foo bar\n ?baz\n'
+        self.assertEqual(self._ids_and_values(Tokenizer(string)),
+                         self._expected(Tokenizer, string))
+
+    def test_iter_lazy(self):
+        "TokenizerBase: iter(tokenizer) reads tokens on demand"
+        Tokenizer = self._make_tokenizer()
+        tokenizer = Tokenizer('foo bar')
+        it = iter(tokenizer)
+        self.assertEqual(next(it).value(), 'foo')
+        self.assertEqual(tokenizer.token().value(), ' ')
+        self.assertEqual(next(it).value(), 'bar')
+        self.assertIsNone(next(it, None))
+#############################################################################
+
+#############################################################################
+# Test: TokenizerBase: _get_buffer()
+#############################################################################
+class Test_TokenizerBase__get_buffer(TestCase):
+
+    def _make_tokenizer(self):
+        class Tokenizer(TokenizerBase):
+            init_calls = 0
+            def _init_buffer(self, *args, **kw):
+                type(self).init_calls += 1
+                self._buffer = CharOrientedBuffer(*args, **kw)
+        return Tokenizer
+
+    def test_get_buffer_uninitialized(self):
+        "TokenizerBase: _get_buffer() calls _init_buffer() once, if " \
+        "_buffer is None"
+        Tokenizer = self._make_tokenizer()
+        tokenizer = Tokenizer.__new__(Tokenizer)
+        self.assertIsNone(tokenizer._buffer)
+        buff = tokenizer._get_buffer()
+        self.assertIsInstance(buff, CharOrientedBuffer)
+        self.assertIs(tokenizer._buffer, buff)
+        self.assertIs(tokenizer._get_buffer(), buff)
+        self.assertEqual(Tokenizer.init_calls, 1)
+
+    def test_get_buffer_initialized(self):
+        "TokenizerBase: _get_buffer() returns buffer set up by constructor"
+        Tokenizer = self._make_tokenizer()
+        tokenizer = Tokenizer('foo')
+        buff = tokenizer._buffer
+        self.assertIsNotNone(buff)
+        self.assertIs(tokenizer._get_buffer(), buff)
+        self.assertEqual(Tokenizer.init_calls, 1)
+
+    def test_get_buffer_not_shared(self):
+        "TokenizerBase: _get_buffer() returns distinct buffers for " \
+        "distinct tokenizers"
+        Tokenizer = self._make_tokenizer()
+        self.assertIsNot(Tokenizer('foo')._get_buffer(),
+                         Tokenizer('foo')._get_buffer())
+        self.assertIsNone(Tokenizer._buffer)
+#############################################################################
+
+if __name__ == "__main__":
+    import sys
+    import unittest
+    ldr = unittest.TestLoader()
+    suite = unittest.TestSuite()
+    # Load tests to test suite
+    tclasses = [
+        Test_TokenizerBase__find_token_types,
+        Test_TokenizerBase_fsm_char,
+        Test_TokenizerBase__error_token,
+        Test_TokenizerBase_token,
+        Test_TokenizerBase_tokens,
+        Test_TokenizerBase__get_buffer,
+    ]
+
+    for tclass in tclasses:
+        suite.addTests(ldr.loadTestsFromTestCase(tclass))
+
+    if not unittest.TextTestRunner(verbosity = 2).run(suite).wasSuccessful():
+        sys.exit(1)
+
+# Local Variables:
+# # tab-width:4
+# # indent-tabs-mode:nil
+# # End:
+# vim: set syntax=python expandtab tabstop=4 shiftwidth=4:
@@ -0,0 +1,247 @@
+# coding: utf-8
+""" ezmlex_tests.test_tokens
+
+Unit tests for ezmlex.tokens module
+"""
+
+
+#
+# Copyright (c) 2012 by Pawel Tomulik
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE
+
+__docformat__ = "restructuredText"
+
+
+import re
+from unittest import TestCase
+from ezmlex.tokens import def_token, del_token, find_matching_tokens, \
+                          fuse_tokens, find_fused_tokens
+from ezmlex.tokenizers import TokenizerBase
+from ezmlex.buffers import CharOrientedBuffer
+
+def _matching_tokens(tab, *args):
+    # find_matching_tokens() with match objects replaced by lengths
+    return sorted([ (_id, Token, m.end() - m.start()) \
+                    for _id, Token, m in find_matching_tokens(tab, *args) ])
+
+#############################################################################
+# Test: fuse_tokens() and find_fused_tokens()
+#############################################################################
+class Test_fuse_tokens(TestCase):
+
+    def test_fuse_tokens_overlapping(self):
+        "find_fused_tokens(fuse_tokens(tab), s) finds all tokens matching " \
+        "at the same position, as find_matching_tokens(tab, s) does"
+        tab = {}
+        def_token(tab, 'Int', r'[0-9]+')
+        def_token(tab, 'Float', r'[0-9]+\.[0-9]*')
+        def_token(tab, 'Digit', r'[0-9]')
+        def_token(tab, 'Word', r'\w+')
+        def_token(tab, 'Empty', r'x*')
+        fused = fuse_tokens(tab)
+        self.assertIsNotNone(fused)
+        for string in ['12.5', '7', 'abc', '', '.', '3x']:
+            for pos in range(len(string) + 1):
+                self.assertEqual(
+                    sorted(find_fused_tokens(fused, string, pos)),
+                    _matching_tokens(tab, string, pos), (string, pos))
+
+    def test_fuse_tokens_no_match(self):
+        "find_fused_tokens(fuse_tokens(tab), s) returns [] if no token " \
+        "matches s"
+        tab = {}
+        def_token(tab, 'A', r'a+')
+        def_token(tab, 'B', r'b')
+        self.assertEqual(find_fused_tokens(fuse_tokens(tab), 'cab'), [])
+
+    def test_fuse_tokens_groups(self):
+        "fuse_tokens(tab) returns None if a token pattern defines groups"
+        tab = {}
+        def_token(tab, 'A', r'a+')
+        def_token(tab, 'Rep', r'(a)\1')
+        self.assertIsNone(fuse_tokens(tab))
+
+    def test_fuse_tokens_mixed_flags(self):
+        "fuse_tokens(tab) returns None if token patterns have different " \
+        "flags"
+        tab = {}
+        def_token(tab, 'A', r'a+')
+        def_token(tab, 'I', r'abc', None, re.IGNORECASE)
+        self.assertIsNone(fuse_tokens(tab))
+        del_token(tab, 'A')
+        self.assertIsNotNone(fuse_tokens(tab))
+
+    def test_fuse_tokens_too_many(self):
+        "fuse_tokens(tab) returns None if there are too many tokens to fit " \
+        "into one expression"
+        tab = {}
+        for i in range(150):
+            def_token(tab, 'T%d' % i, 'a{%d}' % (i + 1))
+        self.assertIsNone(fuse_tokens(tab))
+#############################################################################
+
+#############################################################################
+# Test: TokenizerBase: fused token types
+#############################################################################
+class Test_TokenizerBase_fused_token_types(TestCase):
+
+    def test_fallback_for_groups(self):
+        "TokenizerBase: _find_token_types() falls back to " \
+        "find_matching_tokens() if token patterns can't be fused"
+        class Tokenizer(TokenizerBase): pass
+        Tokenizer.def_token_type('Rep', r'(a)\1')
+        Tokenizer.def_token_type('A', r'a')
+        Tokenizer.def_token_type('I', r'(?i)ab')
+        for string in ['aa', 'ab', 'AB', 'b']:
+            self.assertEqual(sorted(Tokenizer._find_token_types(string)),
+                _matching_tokens(Tokenizer.token_types(), string), string)
+
+    def test_rebuilt_after_del_token_type(self):
+        "TokenizerBase: _find_token_types() forgets token types deleted " \
+        "with del_token_type()"
+        class Tokenizer(TokenizerBase): pass
+        Tokenizer.def_token_type('A', r'a+')
+        Tokenizer.def_token_type('AB', r'ab')
+        A, AB = Tokenizer.token_type('A'), Tokenizer.token_type('AB')
+        self.assertEqual(sorted(Tokenizer._find_token_types('ab')),
+                         [('A', A, 1), ('AB', AB, 2)])
+        Tokenizer.del_token_type('AB')
+        self.assertEqual(Tokenizer._find_token_types('ab'), [('A', A, 1)])
+        Tokenizer.def_token_type('AB', r'a+b')
+        AB = Tokenizer.token_type('AB')
+        self.assertEqual(sorted(Tokenizer._find_token_types('aab')),
+                         [('A', A, 2), ('AB', AB, 3)])
+
+    def test_many_token_types(self):
+        "TokenizerBase: token() works with more token types sharing the " \
+        "first character than can be fused into one expression"
+        class Buffer(CharOrientedBuffer):
+            _fsm_identity = True
+        class Tokenizer(TokenizerBase):
+            def _init_buffer(self, *args, **kw):
+                self._buffer = Buffer(*args, **kw)
+        for i in range(120):
+            Tokenizer.def_token_type('K%d' % i, 'k%d' % i)
+        Tokenizer.def_token_type('Space', r' +')
+        Tokenizer.def_error_type('Error', r'.', 'error')
+        tokens = Tokenizer('k7 k119 k42 k').tokens()
+        self.assertEqual([(t.id(), t.value()) for t in tokens],
+                         [('K7', 'k7'), ('Space', ' '),
+                          ('K119', 'k119'), ('Space', ' '),
+                          ('K42', 'k42'), ('Space', ' '),
+                          ('Error', 'k')])
+#############################################################################
+
+#############################################################################
+# Test: TokenBase: __slots__
+#############################################################################
+class Test_TokenBase___slots__(TestCase):
+
+    def _make_token_class(self):
+        tab = {}
+        def_token(tab, 'Id', r'[a-z]+')
+        return tab['Id']
+
+    def test_token_has_no_dict(self):
+        "TokenBase: instances of tokens defined by def_token() have no " \
+        "__dict__"
+        Token = self._make_token_class()
+        token = Token(1, 2, 3, 'foo')
+        self.assertFalse(hasattr(token, '__dict__'))
+
+    def test_token_rejects_new_attributes(self):
+        "TokenBase: instances of tokens defined by def_token() reject " \
+        "attributes not listed in __slots__"
+        Token = self._make_token_class()
+        token = Token(1, 2, 3, 'foo')
+        with self.assertRaises(AttributeError):
+            token.foo = 'bar'
+        token.set_value('bar')
+        self.assertEqual(token.value(), 'bar')
+
+    def test_token_class_attributes(self):
+        "TokenBase: class-level attributes of tokens work with __slots__"
+        Token = self._make_token_class()
+        Token.is_error = classmethod(lambda cls : True)
+        token = Token(1, 2, 3, 'foo')
+        self.assertEqual(token.id(), 'Id')
+        self.assertTrue(token.is_error())
+        self.assertTrue(Token.match('foo'))
+#############################################################################
+
+#############################################################################
+# Test: TokenBase: __init__()
+#############################################################################
+class Test_TokenBase___init__(TestCase):
+
+    def _make_token_class(self):
+        tab = {}
+        def_token(tab, 'Id', r'[a-z]+')
+        return tab['Id']
+
+    def test_init_value(self):
+        "TokenBase: Token(line_no, col_no, char_no, value) sets markers " \
+        "and value"
+        Token = self._make_token_class()
+        token = Token(1, 2, 3, 'foo')
+        self.assertEqual((token.line_no(), token.col_no(), token.char_no()),
+                         (1, 2, 3))
+        self.assertEqual(token.value(), 'foo')
+        self.assertEqual(token.str(), 'foo')
+        self.assertEqual(token.unicode(), u'foo')
+
+    def test_init_value_default(self):
+        "TokenBase: Token(line_no, col_no, char_no) sets value to None"
+        Token = self._make_token_class()
+        token = Token(1, 2, 3)
+        self.assertIsNone(token.value())
+        token.set_value('foo')
+        self.assertEqual(token.value(), 'foo')
+
+    def test_init_value_keyword(self):
+        "TokenBase: Token(..., value = v) sets value to v"
+        Token = self._make_token_class()
+        self.assertEqual(Token(1, 2, 3, value = u'foo').value(), u'foo')
+#############################################################################
+
+if __name__ == "__main__":
+    import sys
+    import unittest
+    ldr = unittest.TestLoader()
+    suite = unittest.TestSuite()
+    # Load tests to test suite
+    tclasses = [
+        Test_fuse_tokens,
+        Test_TokenizerBase_fused_token_types,
+        Test_TokenBase___slots__,
+        Test_TokenBase___init__,
+    ]
+
+    for tclass in tclasses:
+        suite.addTests(ldr.loadTestsFromTestCase(tclass))
+
+    if not unittest.TextTestRunner(verbosity = 2).run(suite).wasSuccessful():
+        sys.exit(1)
+
+# Local Variables:
+# # tab-width:4
+# # indent-tabs-mode:nil
+# # End:
+# vim: set syntax=python expandtab tabstop=4 shiftwidth=4: